@@ -1,10 +1,14 @@
 import asyncio
-from typing import List, Optional
-from langchain_core.messages import BaseMessage, ToolMessage
+import time
+from typing import List, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage, message_chunk_to_message
 from langchain_core.tools import Tool
 from auto_nav.browser import Browser
-from auto_nav.browser_tools import create_browser_tools
+from auto_nav.browser_tools import READ_ONLY_TOOLS, create_browser_tools
+from auto_nav.memory import ConversationMemory
+from auto_nav.plan_cache import PlanCache, PlanStep, find_element
 from auto_nav.prompt_utils import create_observation_message, load_prompt
+from auto_nav.tracing import Tracer, trace_span
 
 class Agent:
     """Encapsulates the agent logic, browser interaction, and LLM communication."""
@@ -12,21 +16,54 @@ class Agent:
         self,
         llm,
         max_iterations: int =50,
+        dom_diff_observations: bool = False,
+        memory_token_budget: Optional[int] = None,
+        memory_keep_last_turns: int = 3,
+        browser: Optional[Browser] = None,
+        streaming: bool = False,
+        plan_cache: Optional[PlanCache] = None,
+        tracer: Optional[Tracer] = None,
     ):
         self.llm = llm
         self.max_iterations = max_iterations
-        self.browser: Optional[Browser] = None
+        # When set, observations on an unchanged url only list what changed since the previous step,
+        # so their text is kept in the history for the LLM to refer back to.
+        self.dom_diff_observations = dom_diff_observations
+        # Token counts of every prompt end up in self.memory.step_tokens, with or without a budget
+        self.memory = ConversationMemory(token_budget=memory_token_budget, keep_last_turns=memory_keep_last_turns)
+        # A browser passed in is started by the agent if needed and closed by agent.close()
+        self.browser: Optional[Browser] = browser
         self.tools: List[Tool] = []
         self.model_with_tools = None 
+        # With streaming, responses are printed as they arrive and tool calls start running as soon
+        # as they are complete, while the rest of the response is still being generated.
+        self.streaming = streaming
+        self.first_action_latencies: List[float] = []
+        # Completed runs are recorded in the plan cache and replayed for the same task, without the LLM,
+        # until an element cannot be found or an action fails
+        self.plan_cache = plan_cache
+        # With a tracer, LLM calls, tool calls and the browser's stages are recorded as spans per step.
+        # Without one, the browser's tracer is used if it has one.
+        self.tracer = tracer
+        # With skip_unchanged screenshots, the last image sent stays in the history for the
+        # observations without a new one to refer to
+        self._retained_image: Optional[HumanMessage] = None
 
     async def setup(self):
         await self._initialize_browser_and_tools()
     
     async def _initialize_browser_and_tools(self):
-        if self.browser:
+        if self.model_with_tools:
             return
-        self.browser = Browser()
-        await self.browser.start()
+        if not self.browser:
+            self.browser = Browser(incremental_dom=self.dom_diff_observations, tracer=self.tracer)
+        elif self.dom_diff_observations:
+            self.browser.incremental_dom = True
+        if self.tracer and not self.browser.tracer:
+            self.browser.tracer = self.tracer
+        self.tracer = self.tracer or self.browser.tracer
+        if not self.browser._is_initialized:
+            await self.browser.start()
         self.tools = create_browser_tools(self.browser)
         self.model_with_tools = self.llm.bind_tools(self.tools)
 
@@ -37,16 +74,36 @@ class Agent:
         main_prompt = load_prompt()
         message_history: List[BaseMessage] = [main_prompt]
         message_history.append(task)
+        # The first observation of the task always has an image, the history holds none yet
+        self._retained_image = None
+        self.browser.forget_screenshot()
 
         print(f"\n--- Running Agent for Task: {task} ---")
+        if self.tracer:
+            self.tracer.set_context(task=task, step=0)
+        start_url = await self.browser.get_current_url()
+        recorded_steps: List[PlanStep] = []
+        if self.plan_cache:
+            plan = self.plan_cache.lookup(task, start_url)
+            if plan:
+                completed, recorded_steps, replay_log = await self._replay_plan(plan.steps)
+                print(f"Plan cache: {self.plan_cache.summary()}")
+                if completed:
+                    return plan.result
+                message_history.append(HumanMessage(content='\n'.join([
+                    '[These actions were already performed for this task, continue from the current state]',
+                    *replay_log,
+                ])))
         current_iteration = 0
-        current_browser_state_message = await create_observation_message(self.browser, current_iteration, self.max_iterations)
-        message_history.append(current_browser_state_message)               # Add initial browser state to message history
-        response = await self.model_with_tools.ainvoke(message_history)     # Send the prompt to LLM
-        message_history.pop()                                               # Remove the browser state message. will add updated one later
+        current_browser_state_message = await create_observation_message(self.browser, current_iteration, self.max_iterations, self.dom_diff_observations)
+        self._add_observation(message_history, current_browser_state_message)  # Add initial browser state to message history
+        self._count_prompt_tokens(self.memory.record_step(message_history))
+        response, pending_tools = await self._invoke_llm(message_history)   # Send the prompt to LLM
+        self._retire_observation(message_history)                           # Remove the browser state message. will add updated one later
         message_history.append(response)                                    # Add LLM response to message history. so it knows what it did last
 
-        print(f"Initial LLM Response Content:\n{response.content}")
+        if not self.streaming:
+            print(f"Initial LLM Response Content:\n{response.content}")
         print(f"Initial LLM Tool Calls: {response.tool_calls}")
 
 
@@ -54,8 +111,9 @@ class Agent:
         # For more complex tasks with lot of steps, you may need more iterations. Configure the parameter accordingly.
         while current_iteration < self.max_iterations:
             current_iteration += 1
+            if self.tracer:
+                self.tracer.set_step(current_iteration)
             print(f"\nIteration {current_iteration + 1}/{self.max_iterations}: LLM requested {len(response.tool_calls)} tool call(s)...")
-            tool_messages: List[ToolMessage] = []
 
             #When the task is done, LLM will call this tool to indicate that the task is done
             ultimate_task_done = any(tool_call.get("name") == "ultimate_task_done" for tool_call in response.tool_calls)
@@ -63,21 +121,43 @@ class Agent:
                 print("Ultimate task done. Breaking the loop.")
                 break
             
-            #Execute the tool calls in sequence
-            for tool_call in response.tool_calls:
-                tool_result: ToolMessage = await self._execute_tool_call(tool_call)
-                tool_messages.append(tool_result)
+            #Execute the tool calls, read-only ones concurrently. When streaming they are already running.
+            if pending_tools:
+                tool_messages: List[ToolMessage] = await pending_tools
+            else:
+                tool_messages = await self._execute_tool_calls(response.tool_calls)
+            if self.plan_cache:
+                recorded_steps.extend(self._plan_steps(response.tool_calls, tool_messages))
 
             print(f"\nSending {len(tool_messages)} tool results back to LLM...")
+            routing = self.browser.record_routing_step()
+            if routing.blocked:
+                print(f"Blocked {routing.blocked} of {routing.requests} requests this step (~{routing.estimated_bytes_saved // 1024} KiB saved)")
             message_history.extend(tool_messages)
-            current_browser_state_message = await create_observation_message(self.browser, current_iteration, self.max_iterations)
-            message_history.append(current_browser_state_message)
-            response = await self.model_with_tools.ainvoke(message_history)
-            message_history.pop()
+            compacted = self.memory.compact(message_history)                # Collapse old turns if the history is over budget
+            # After a compaction the page is listed in full: earlier diffs may build on observations that were summarized away
+            changes_only = self.dom_diff_observations and not compacted
+            current_browser_state_message = await create_observation_message(self.browser, current_iteration, self.max_iterations, changes_only)
+            self._add_observation(message_history, current_browser_state_message)
+            tokens = self.memory.record_step(message_history)
+            self._count_prompt_tokens(tokens)
+            observation = self.browser.observation_metrics[-1]
+            print(f"Prompt size: ~{tokens} tokens, observation built in {observation.total_ms:.0f} ms ({observation.serial_ms:.0f} ms of stages)")
+            response, pending_tools = await self._invoke_llm(message_history)
+            self._retire_observation(message_history)
             message_history.append(response)
-            print(f"\nLLM Response Content:\n{response.content}")
+            if not self.streaming:
+                print(f"\nLLM Response Content:\n{response.content}")
             print(f"LLM Tool Calls: {response.tool_calls}")
 
+        if pending_tools:
+            # Let actions dispatched before ultimate_task_done, or in the last allowed step, finish.
+            # They are part of the task, so they belong in the recorded plan too.
+            final_tool_messages: List[ToolMessage] = await pending_tools
+            if self.plan_cache:
+                recorded_steps.extend(self._plan_steps(response.tool_calls, final_tool_messages))
+        if self.plan_cache and any(tool_call.get("name") == "ultimate_task_done" for tool_call in response.tool_calls):
+            self.plan_cache.store(task, start_url, recorded_steps, str(response.content))
         print("\n--- Agent Finished ---")
         if response.tool_calls and current_iteration >= self.max_iterations:
             print("Reached max iterations, stopping.")
@@ -97,8 +177,189 @@ class Agent:
                 return f"Agent finished without a final text response. Last response object: {response!r}"
 
 
+    async def _invoke_llm(self, message_history: List[BaseMessage]) -> Tuple[AIMessage, Optional[asyncio.Task]]:
+        """
+        Sends the prompt to the LLM. When streaming, also returns the task running the tool calls that
+        were dispatched while the response was generated; it resolves to their results in order.
+        """
+        with trace_span(self.tracer, 'llm', streaming=self.streaming) as span:
+            if not self.streaming:
+                response, pending_tools = await self.model_with_tools.ainvoke(message_history), None
+            else:
+                response, pending_tools = await self._stream_llm(message_history)
+            span['tool_calls'] = len(response.tool_calls)
+        return response, pending_tools
+
+    def _count_prompt_tokens(self, tokens: int) -> None:
+        if self.tracer:
+            self.tracer.count('prompt.tokens', tokens)
+
+    async def _stream_llm(self, message_history: List[BaseMessage]) -> Tuple[AIMessage, asyncio.Task]:
+        """
+        Streams the response, printing its content as it arrives. A tool call is complete once the next
+        one starts (or the stream ends) and is handed to the tool runner right away. Nothing after an
+        ultimate_task_done call is dispatched, but the calls before it may already have run.
+        """
+        start_time = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue()
+        tool_runner = asyncio.create_task(self._run_dispatched_tool_calls(queue))
+        aggregate = None
+        dispatched = 0
+        done_dispatching = False
+        first_action_s: Optional[float] = None
+
+        def dispatch(tool_calls: List[dict]) -> None:
+            nonlocal dispatched, done_dispatching, first_action_s
+            for tool_call in tool_calls[dispatched:]:
+                dispatched += 1
+                if done_dispatching:
+                    continue
+                if tool_call.get("name") == "ultimate_task_done":
+                    done_dispatching = True
+                    continue
+                if first_action_s is None:
+                    first_action_s = time.perf_counter() - start_time
+                queue.put_nowait(tool_call)
+
+        print("\nLLM Response Content:")
+        try:
+            async for chunk in self.model_with_tools.astream(message_history):
+                aggregate = chunk if aggregate is None else aggregate + chunk
+                if isinstance(chunk.content, str) and chunk.content:
+                    print(chunk.content, end='', flush=True)
+                # Every tool call but the last one is fully generated
+                dispatch(aggregate.tool_calls[:-1])
+            response = message_chunk_to_message(aggregate) if aggregate is not None else AIMessage(content='')
+            dispatch(response.tool_calls)
+        except BaseException:
+            tool_runner.cancel()
+            raise
+        finally:
+            queue.put_nowait(None)
+        print()
+        if first_action_s is not None:
+            self.first_action_latencies.append(first_action_s)
+            if self.tracer:
+                self.tracer.count('llm.first_action_ms', first_action_s * 1000)
+            print(f"First action dispatched after {first_action_s:.2f}s of streaming")
+        return response, tool_runner
+
+    async def _run_dispatched_tool_calls(self, queue: asyncio.Queue) -> List[ToolMessage]:
+        """Runs tool calls as they are dispatched, batching the ones already waiting, until the None sentinel."""
+        tool_messages: List[ToolMessage] = []
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            finished = batch[-1] is None
+            tool_messages.extend(await self._execute_tool_calls([call for call in batch if call is not None]))
+        return tool_messages
+
+    async def _replay_plan(self, steps: List[PlanStep]) -> Tuple[bool, List[PlanStep], List[str]]:
+        """
+        Replays a cached plan. Elements are looked up by their fingerprint in a fresh DOM before every
+        indexed action. Returns whether the whole plan ran, the steps that did and a log of them.
+        """
+        replayed: List[PlanStep] = []
+        replay_log: List[str] = []
+        for number, step in enumerate(steps):
+            args = dict(step.args)
+            if 'index' in args:
+                await self.browser.update_dom()
+                index = find_element(self.browser.dom, step.element, args['index']) if step.element else None
+                if index is None:
+                    print(f"Plan replay diverged at step {number + 1}: element {step.element} not found")
+                    self.plan_cache.stats.divergences += 1
+                    return False, replayed, replay_log
+                args['index'] = index
+            result = await self._execute_tool_call({"name": step.tool, "args": args, "id": f"replay-{number}"})
+            if result.content.startswith("Error"):
+                print(f"Plan replay diverged at step {number + 1}: {result.content}")
+                self.plan_cache.stats.divergences += 1
+                return False, replayed, replay_log
+            replayed.append(step)
+            replay_log.append(f"- {step.tool}({args}) -> {result.content}")
+            self.plan_cache.stats.replayed_steps += 1
+        self.plan_cache.stats.completed_replays += 1
+        print(f"Plan replayed in full ({len(steps)} steps), the LLM was not called.")
+        return True, replayed, replay_log
+
+    def _plan_steps(self, tool_calls: List[dict], tool_messages: List[ToolMessage]) -> List[PlanStep]:
+        """Steps worth replaying: successful actions, with the elements they used in the DOM the LLM saw."""
+        results = {message.tool_call_id: message.content for message in tool_messages}
+        return [
+            PlanCache.make_step(tool_call, self.browser.dom)
+            for tool_call in tool_calls
+            if tool_call.get("name") not in READ_ONLY_TOOLS
+            and not str(results.get(tool_call.get("id"), "Error")).startswith("Error")
+        ]
+
+    def _add_observation(self, message_history: List[BaseMessage], observation: HumanMessage) -> None:
+        """
+        Appends an observation. One with an image replaces the image kept from earlier steps. One without
+        (the screenshot was skipped as unchanged) refers to the kept image, which is put back if memory
+        compaction removed it from the history.
+        """
+        if any(part.get("type") == "image_url" for part in observation.content):
+            self._drop_retained_image(message_history)
+        elif self._retained_image is not None and not any(message is self._retained_image for message in message_history):
+            message_history.append(self._retained_image)
+        message_history.append(observation)
+
+    def _retire_observation(self, message_history: List[BaseMessage]) -> None:
+        """
+        Removes the latest observation, keeping its text when later observations may be diffs against it,
+        and its image when later screenshots may be skipped as unchanged. Only the latest image is kept.
+        """
+        observation = message_history.pop()
+        kept = [observation.content[0]] if self.dom_diff_observations else []
+        images = [part for part in observation.content if part.get("type") == "image_url"]
+        if images and self.browser.screenshot_config.skip_unchanged:
+            if not kept:
+                kept = [{"type": "text", "text": "[Screenshot of an earlier step]"}]
+            self._retained_image = HumanMessage(content=kept + images)
+            message_history.append(self._retained_image)
+        elif kept:
+            message_history.append(HumanMessage(content=kept))
+
+    def _drop_retained_image(self, message_history: List[BaseMessage]) -> None:
+        """Removes the previously kept image from the history, leaving the observation text kept with it."""
+        for position, message in enumerate(message_history):
+            if message is self._retained_image:
+                if self.dom_diff_observations:
+                    message_history[position] = HumanMessage(content=message.content[:1])
+                else:
+                    del message_history[position]
+                break
+        self._retained_image = None
+
+    async def _execute_tool_calls(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        """
+        Executes the tool calls of one LLM response. Runs of consecutive read-only calls are dispatched
+        concurrently, every other call runs on its own in order. Results keep the order of tool_calls.
+        """
+        tool_messages: List[ToolMessage] = []
+        batch: List[dict] = []
+        for tool_call in tool_calls + [None]:
+            if tool_call is not None and tool_call.get("name") in READ_ONLY_TOOLS:
+                batch.append(tool_call)
+                continue
+            if batch:
+                tool_messages.extend(await asyncio.gather(*(self._execute_tool_call(call) for call in batch)))
+                batch = []
+            if tool_call is not None:
+                tool_messages.append(await self._execute_tool_call(tool_call))
+        return tool_messages
+
     async def _execute_tool_call(self, tool_call: dict) -> ToolMessage:
         """Executes a single tool call requested by the LLM."""
+        with trace_span(self.tracer, 'tool', tool=tool_call.get("name")) as span:
+            message = await self._run_tool(tool_call)
+            span['error'] = message.content.startswith("Error")
+        return message
+
+    async def _run_tool(self, tool_call: dict) -> ToolMessage:
         tool_name = tool_call.get("name")
         tool_args = tool_call.get("args", {})
         tool_id = tool_call.get("id")
@@ -130,5 +391,7 @@ class Agent:
             try:
                 await self.browser.close()
                 self.browser = None
+                self.tools = []
+                self.model_with_tools = None
             except Exception as e:
                 print(f"Error closing browser: {e}")
\ No newline at end of file
@@ -3,7 +3,29 @@ import base64
 import logging
 from typing import Optional
 import time
-from auto_nav.dom_utils import get_elements, dom_to_string, DOM
+from pydantic import BaseModel
+from auto_nav.screenshot_utils import (
+    digest_difference,
+    draw_element_labels,
+    encode_image,
+    frame_digest,
+    hamming_distance,
+    load_image,
+    perceptual_hash,
+    prepare_image,
+)
+from auto_nav.dom_utils import (
+    DOM_ENGINES,
+    STABLE_ID_ATTRIBUTE,
+    carry_over_indices,
+    extract_dom,
+    dom_to_string,
+    DOM,
+    DomDiff,
+)
+from auto_nav.response_cache import ResponseCache
+from auto_nav.routing import BlockRules, RequestRouter, RoutingStats
+from auto_nav.tracing import Tracer, trace_span
 
 from playwright.async_api import (
     Playwright,
@@ -22,27 +44,47 @@ class BrowserError(Exception):
         super().__init__(message)
         logger.error(f"BrowserError: {message}")
 
-class Browser:
+# Counts DOM mutations and records when the last one happened, so update_dom can tell whether the
+# page changed since the last extraction and wait_for_page_load can tell when the DOM has settled.
+# Only the count is kept, not where the page changed: any mutation means a whole-page extraction.
+# Mutations made by highlight_elements_in_page/remove_highlights and stable id tagging are ignored.
+DOM_MUTATION_SCRIPT = """
+(() => {
+    if (window.__autoNavDomVersion !== undefined) return;
+    window.__autoNavDomVersion = 0;
+    window.__autoNavLastMutation = performance.now();
+    const isHighlightLabel = (node) => node.nodeType === Node.ELEMENT_NODE && node.classList.contains('playwright-highlight-label');
+    const isHighlightMutation = (record) => {
+        if (record.type === 'attributes') {
+            return record.attributeName === 'browser-user-highlight-id'
+                || record.attributeName === 'data-autonav-id'
+                || (record.attributeName === 'style' && record.target.hasAttribute('browser-user-highlight-id'));
+        }
+        if (record.type === 'childList') {
+            return [...record.addedNodes, ...record.removedNodes].every(isHighlightLabel);
+        }
+        return false;
+    };
+    new MutationObserver((records) => {
+        if (!records.every(isHighlightMutation)) {
+            window.__autoNavDomVersion++;
+            window.__autoNavLastMutation = performance.now();
+        }
+    }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+})();
+"""
 
-    def __init__(self, user_agent: Optional[str] = None):
-        self.playwright: Optional[Playwright] = None
-        self.browser: Optional[PlaywrightBrowser] = None
-        self.context: Optional[PlaywrightContext] = None
-        self.page: Optional[Page] = None
-        self.user_agent = user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-        self._is_initialized = False
-        self._start_lock = asyncio.Lock()
-        self.dom: Optional[DOM] = None
+# Milliseconds since the last DOM mutation, or null when the mutation observer is not installed
+DOM_QUIET_SCRIPT = 'window.__autoNavLastMutation === undefined ? null : performance.now() - window.__autoNavLastMutation'
 
-    async def start(self) -> None:
-        async with self._start_lock:
-            if self._is_initialized:
-                logger.warning("Browser is already initialized.")
-                return
-            logger.info("Starting browser...")
-            try:
-                self.playwright = await async_playwright().start()
-                chrome_args = [
+# What update_dom compares to tell whether an extracted DOM is still current. performance.timeOrigin
+# identifies the document: a reload or a redirect back to the same url starts a new mutation count.
+PAGE_STATE_SCRIPT = '[location.href, window.__autoNavDomVersion ?? null, scrollX, scrollY, innerWidth, innerHeight, performance.timeOrigin]'
+
+# Long-lived requests that never finish while the page is open, so they do not count as in flight
+UNTRACKED_RESOURCE_TYPES = {'websocket', 'eventsource', 'media'}
+
+CHROME_ARGS = [
 	'--disable-cookie-encryption',  # we need to be able to write unencrypted cookies to save/load auth.json
 	'--disable-sync', 
 	'--allow-legacy-extension-manifests',
@@ -89,22 +131,209 @@ class Browser:
 	'--disable-breakpad',
 	'--enable-features=NetworkService',
 ]
-                self.browser = await self.playwright.chromium.launch(
-                    headless=False,
-                    args=chrome_args,
-                    handle_sigterm=False,
-                    handle_sigint=False,
-                )
+
+# Extra flags of the lean profile: no GPU compositing, extensions or background networking
+LEAN_CHROME_ARGS = [
+	'--disable-gpu',
+	'--disable-gpu-compositing',
+	'--disable-software-rasterizer',
+	'--disable-extensions',
+	'--disable-background-networking',
+	'--disable-renderer-backgrounding',
+	'--disable-dev-shm-usage',
+	'--mute-audio',
+	'--hide-scrollbars',
+]
+
+class LaunchProfile(BaseModel):
+    """How Chromium is launched and how big its pages are. The default matches a visible desktop window."""
+    headless: bool = False
+    viewport_width: Optional[int] = None    # None uses the window size, headed only
+    viewport_height: Optional[int] = None
+    device_scale_factor: Optional[float] = None
+    extra_args: list[str] = []
+
+    @classmethod
+    def headless_profile(cls, width: int = 1280, height: int = 800) -> 'LaunchProfile':
+        return cls(headless=True, viewport_width=width, viewport_height=height, device_scale_factor=1)
+
+    @classmethod
+    def lean(cls, width: int = 1280, height: int = 800) -> 'LaunchProfile':
+        """Headless with a fixed viewport and the LEAN_CHROME_ARGS, for display-less servers."""
+        return cls(
+            headless=True,
+            viewport_width=width,
+            viewport_height=height,
+            device_scale_factor=1,
+            extra_args=LEAN_CHROME_ARGS,
+        )
+
+    def context_options(self) -> dict:
+        """Viewport options for Playwright's new_context."""
+        if self.viewport_width and self.viewport_height:
+            options = {'viewport': {'width': self.viewport_width, 'height': self.viewport_height}}
+            if self.device_scale_factor:
+                options['device_scale_factor'] = self.device_scale_factor
+            return options
+        # Headless has no window to take the size from, so fall back to Playwright's default viewport
+        return {} if self.headless else {'viewport': None}
+
+async def launch_chromium(playwright: Playwright, profile: Optional[LaunchProfile] = None) -> PlaywrightBrowser:
+    """Launches a Chromium process with the flags every AutoNav browser uses."""
+    profile = profile or LaunchProfile()
+    return await playwright.chromium.launch(
+        headless=profile.headless,
+        args=CHROME_ARGS + [arg for arg in profile.extra_args if arg not in CHROME_ARGS],
+        handle_sigterm=False,
+        handle_sigint=False,
+    )
+
+class WaitConfig(BaseModel):
+    """Thresholds used by Browser.wait_for_page_load to decide that the page has settled."""
+    network_idle_ms: int = 500      # no request in flight or started for this long
+    dom_quiet_ms: int = 300         # no DOM mutation for this long
+    min_wait_s: float = 0.0         # always wait at least this long
+    max_wait_s: float = 5.0         # hard cap, the page is treated as settled after this
+    poll_interval_ms: int = 50
+
+class WaitMetric(BaseModel):
+    action: str
+    waited_s: float
+    settled: bool                   # False when max_wait_s was hit first
+    pending_requests: int
+
+class ScreenshotConfig(BaseModel):
+    """How observation screenshots are encoded before they are sent to the LLM."""
+    format: str = 'png'                     # 'png', 'jpeg' or 'webp'
+    quality: int = 80                       # jpeg/webp quality
+    max_dimension: Optional[int] = None     # downscale so the longest side is at most this many pixels
+    grayscale: bool = False
+    skip_unchanged: bool = False            # skip the screenshot when it looks the same as the last one sent
+    unchanged_threshold: int = 0            # max perceptual hash bits that may differ for a frame to count as unchanged
+    unchanged_tolerance: int = 0            # and max gray level difference of any 4x4 pixel block (see frame_digest)
+
+    @property
+    def media_type(self) -> str:
+        return f'image/{self.format}'
+
+class ScreenshotMetric(BaseModel):
+    format: str
+    width: int
+    height: int
+    bytes: int                              # encoded size, before base64
+    encode_ms: float                        # labelling, resizing and encoding time
+    skipped: bool
+
+class ObservationMetric(BaseModel):
+    """Stage timings of one observation. The stages overlap, serial_ms is what they would take one after another."""
+    page_info_ms: float                     # url and title
+    dom_ms: float
+    screenshot_capture_ms: float
+    screenshot_render_ms: float             # labelling, resizing and encoding, after the DOM is known
+    total_ms: float
+    serial_ms: float
+    speculative_dom_hit: bool
+
+# The fixed minimum wait used before quiescence detection, kept to report the time saved
+LEGACY_MINIMUM_WAIT_S = 2.0
+
+class Browser:
+
+    def __init__(
+        self,
+        user_agent: Optional[str] = None,
+        dom_engine: str = 'soup',
+        incremental_dom: bool = False,
+        wait_config: Optional[WaitConfig] = None,
+        screenshot_config: Optional[ScreenshotConfig] = None,
+        playwright_browser: Optional[PlaywrightBrowser] = None,
+        profile: Optional[LaunchProfile] = None,
+        block_rules: Optional[BlockRules] = None,
+        response_cache: Optional[ResponseCache] = None,
+        speculative_dom: bool = False,
+        stable_ids: bool = False,
+        viewport_margin: Optional[int] = None,
+        compact_dom: bool = False,
+        tracer: Optional[Tracer] = None,
+    ):
+        if dom_engine not in DOM_ENGINES:
+            raise ValueError(f"Unknown DOM engine '{dom_engine}'. Expected one of: {', '.join(DOM_ENGINES)}")
+        if viewport_margin is not None and dom_engine != 'js':
+            raise ValueError("viewport_margin requires dom_engine='js'")
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[PlaywrightBrowser] = playwright_browser
+        # A browser passed in is shared with other Browser instances: only this instance's context is ours to close
+        self._owns_browser = playwright_browser is None
+        self.profile = profile or LaunchProfile()
+        self.context: Optional[PlaywrightContext] = None
+        self.page: Optional[Page] = None
+        self.user_agent = user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
+        self._is_initialized = False
+        self._start_lock = asyncio.Lock()
+        self.dom: Optional[DOM] = None
+        self.dom_engine = dom_engine
+        self.incremental_dom = incremental_dom
+        self.dom_diff: Optional[DomDiff] = None
+        self._dom_state: Optional[list] = None
+        self._next_element_index = 0
+        # With stable_ids, extracted elements are tagged in the page and their index is the tag: indices
+        # survive re-extractions and actions find elements by attribute instead of evaluating the XPath
+        self.stable_ids = stable_ids
+        self.stable_id_fallbacks = 0
+        # With viewport_margin, extraction covers only the viewport plus this many pixels above and below,
+        # so its cost and the prompt stay bounded on long pages; the LLM scrolls to see more. Only the js
+        # engine supports it, the soup engine would still parse the whole document on every scroll.
+        self.viewport_margin = viewport_margin
+        # With compact_dom, the DOM is serialized for the prompt with dom_to_string(compact=True)
+        self.compact_dom = compact_dom
+        # With speculative_dom, wait_for_page_load starts extracting as soon as the network is idle, while it
+        # still waits for the DOM to settle. update_dom uses the result if the page did not change meanwhile.
+        self.speculative_dom = speculative_dom
+        self._speculative_task: Optional[asyncio.Task] = None
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+        self.wait_config = wait_config or WaitConfig()
+        self.wait_metrics: list[WaitMetric] = []
+        self.screenshot_config = screenshot_config or ScreenshotConfig()
+        self.screenshot_metrics: list[ScreenshotMetric] = []
+        self.observation_metrics: list[ObservationMetric] = []
+        self._last_screenshot_hash: Optional[int] = None
+        self._last_screenshot_digest = None     # frame_digest of the last screenshot sent
+        self._inflight_requests: set = set()
+        self._last_network_activity = time.monotonic()
+        # Request interception is only installed when there is something to block or another handler to run
+        self.router = RequestRouter(block_rules)
+        # One cache instance can be shared by every Browser of a process, its directory by several processes
+        self.response_cache = response_cache
+        if response_cache:
+            self.router.handlers.append(response_cache.handle)
+        self.routing_metrics: list[RoutingStats] = []
+        # With a tracer, page waits, DOM extraction, screenshots and highlighting are recorded as spans
+        self.tracer = tracer
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._is_initialized:
+                logger.warning("Browser is already initialized.")
+                return
+            logger.info("Starting browser...")
+            try:
+                if self._owns_browser:
+                    self.playwright = await async_playwright().start()
+                    self.browser = await launch_chromium(self.playwright, self.profile)
                 self.context = await self.browser.new_context(
                     user_agent=self.user_agent,
-                    viewport=None, 
                     java_script_enabled=True,
+                    **self.profile.context_options(),
                 )
+                await self.context.add_init_script(DOM_MUTATION_SCRIPT)
+                if not self.router.block_rules.is_empty() or self.router.handlers:
+                    await self.router.attach(self.context)
                 self.page = await self.context.new_page()
-                await self.page.goto("about:blank")
+                self._track_network(self.page)
                 self._is_initialized = True
-                self.MINIMUM_WAIT_TIME = 2
-                self.dom = await get_elements(self.page)
+                # A new page is already on about:blank, there is nothing to extract yet
+                self.dom = DOM(elements=[], element_map={})
                 logger.info("Browser started successfully.")
 
             except Exception as e:
@@ -117,7 +346,7 @@ class Browser:
             logger.info("Browser not initialized or already closed.")
             return
         logger.info("Closing browser...")
-        await self.playwright.stop()
+        self._discard_speculative_dom()
         if self.page and not self.page.is_closed():
             try:
                 await self.page.close()
@@ -128,14 +357,17 @@ class Browser:
                 await self.context.close()
             except PlaywrightError as e:
                 logger.warning(f"Error closing context: {e}")
-        if self.browser and self.browser.is_connected():
+        if self._owns_browser and self.browser and self.browser.is_connected():
             try:
                 await self.browser.close()
             except PlaywrightError as e:
                 logger.warning(f"Error closing browser: {e}")
+        if self.playwright:
+            await self.playwright.stop()
         self.page = None
         self.context = None
-        self.browser = None
+        if self._owns_browser:
+            self.browser = None
         self.playwright = None
         self._is_initialized = False
         logger.info("Browser closed.")
@@ -145,29 +377,122 @@ class Browser:
             raise BrowserError("Browser page is not available or closed.")
         return self.page
     
-    async def wait_for_page_load(self):
+    def _track_network(self, page: Page) -> None:
+        """Keeps the set of in-flight requests that wait_for_page_load waits on."""
+        def on_request(request):
+            if request.resource_type not in UNTRACKED_RESOURCE_TYPES:
+                self._inflight_requests.add(request)
+            self._last_network_activity = time.monotonic()
+
+        def on_request_done(request):
+            self._inflight_requests.discard(request)
+            self._last_network_activity = time.monotonic()
+
+        page.on('request', on_request)
+        page.on('requestfinished', on_request_done)
+        page.on('requestfailed', on_request_done)
+
+    async def wait_for_page_load(self, action: str = 'page_load'):
+        """
+        Ensures page is settled before continuing.
+        Returns as soon as no request has been in flight for network_idle_ms and the DOM has not
+        changed for dom_quiet_ms, or after max_wait_s, whichever comes first.
+        Every wait is recorded in self.wait_metrics.
         """
-		Ensures page is fully loaded before continuing.
-		Waits for either document.readyState to be complete or minimum WAIT_TIME, whichever is longer.
-		"""
+        with trace_span(self.tracer, 'wait', action=action) as span:
+            await self._wait_until_settled(action)
+            span['settled'] = self.wait_metrics[-1].settled
+
+    async def _wait_until_settled(self, action: str) -> None:
         page = self.get_page()
-        start_time = time.time()
-        try:
-            await page.wait_for_load_state('load', timeout=5000)
-        except Exception:
-            pass
-        elapsed = time.time() - start_time
-        remaining = max(self.MINIMUM_WAIT_TIME - elapsed, 0)
+        config = self.wait_config
+        start_time = time.monotonic()
+        settled = False
+        # An extraction started before this action is stale
+        self._discard_speculative_dom()
+        while True:
+            elapsed = time.monotonic() - start_time
+            if elapsed >= config.max_wait_s:
+                break
+            # The idle window starts no earlier than the wait itself, so requests triggered by the
+            # action that was just performed have time to start
+            network_idle = (
+                not self._inflight_requests
+                and (time.monotonic() - max(self._last_network_activity, start_time)) * 1000 >= config.network_idle_ms
+            )
+            dom_quiet = False
+            if network_idle and self.speculative_dom and self._speculative_task is None:
+                self._speculative_task = asyncio.create_task(self._extract_speculatively(page))
+            if network_idle:
+                try:
+                    quiet_ms = await page.evaluate(DOM_QUIET_SCRIPT)
+                    dom_quiet = quiet_ms is None or quiet_ms >= config.dom_quiet_ms
+                except PlaywrightError:
+                    # The page navigated while checking, keep waiting on the new document
+                    pass
+            if network_idle and dom_quiet and elapsed >= config.min_wait_s:
+                settled = True
+                break
+            await asyncio.sleep(config.poll_interval_ms / 1000)
+
+        metric = WaitMetric(
+            action=action,
+            waited_s=time.monotonic() - start_time,
+            settled=settled,
+            pending_requests=len(self._inflight_requests),
+        )
+        self.wait_metrics.append(metric)
         logger.debug(
-			f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds'
-		)
-        if remaining > 0:
-            await asyncio.sleep(remaining)
+            f'--Page {"settled" if settled else "did not settle"} after {metric.waited_s:.2f} seconds ({action})'
+        )
+
+    def wait_summary(self) -> dict:
+        """Totals of self.wait_metrics, with the time saved compared to the fixed 2 second minimum wait."""
+        waited = [metric.waited_s for metric in self.wait_metrics]
+        return {
+            'waits': len(waited),
+            'total_wait_s': round(sum(waited), 3),
+            'max_wait_s': round(max(waited, default=0.0), 3),
+            'timed_out': sum(not metric.settled for metric in self.wait_metrics),
+            'saved_vs_fixed_wait_s': round(sum(max(LEGACY_MINIMUM_WAIT_S - w, 0.0) for w in waited), 3),
+        }
+
+    def metrics_summary(self) -> dict:
+        """The summaries of the metrics collected so far, by kind, for reporting a run."""
+        return {
+            'wait': self.wait_summary(),
+            'screenshots': self.screenshot_summary(),
+            'observations': self.observation_summary(),
+        }
+
+    def record_routing_step(self) -> RoutingStats:
+        """Closes the current agent step of the request router's stats and keeps it in self.routing_metrics."""
+        stats = self.router.step_stats()
+        self.routing_metrics.append(stats)
+        if stats.blocked:
+            logger.debug(
+                f'--Blocked {stats.blocked}/{stats.requests} requests {stats.blocked_by_type}, '
+                f'~{stats.estimated_bytes_saved // 1024} KiB saved'
+            )
+        return stats
+
+    def routing_summary(self) -> dict:
+        """Totals of the request router's stats, with the response cache's when there is one."""
+        stats = self.router.stats
+        summary = {
+            'requests': stats.requests,
+            'blocked': stats.blocked,
+            'blocked_by_type': dict(stats.blocked_by_type),
+            'estimated_bytes_saved': stats.estimated_bytes_saved,
+        }
+        if self.response_cache:
+            summary['cache'] = self.response_cache.summary()
+        return summary
 
     async def navigate_to_url(self, url: str) -> None:
         page = self.get_page()
         await page.goto(url)
-        await self.wait_for_page_load()
+        await self.wait_for_page_load('navigate')
 
     async def get_current_url(self) -> str:
         page = self.get_page()
@@ -210,19 +535,131 @@ class Browser:
         """
         try:
             page = self.get_page()
-            self.dom = await get_elements(page) 
-            return dom_to_string(self.dom.elements)
+            speculative = await self._take_speculative_dom(page)
+            if self.incremental_dom:
+                await self._update_dom_incremental(page, speculative)
+            else:
+                self.dom = speculative[1] if speculative else await self._extract_dom(page)
+            return dom_to_string(self.dom.elements, self.compact_dom)
         except Exception as e:
             logger.error(f"Error getting  DOM state: {e}", exc_info=True)
             raise BrowserError(f"Failed to get  DOM state: {e}") from e
         
+    async def _update_dom_incremental(self, page: Page, speculative: Optional[tuple[list, DOM]] = None) -> None:
+        """
+        Skips extraction when nothing changed since the last call (same document, no DOM mutations,
+        same scroll position and viewport). Otherwise the whole page is extracted again, whatever
+        part of it changed; on the same url the indices of unchanged elements are carried over and
+        what changed is recorded in self.dom_diff.
+        """
+        state = speculative[0] if speculative else await page.evaluate(PAGE_STATE_SCRIPT)
+        if self.dom and self._dom_state == state and state[1] is not None:
+            self.dom_diff = DomDiff(added=[], removed=[], unchanged=len(self.dom.element_map))
+            return
+
+        dom = speculative[1] if speculative else await self._extract_dom(page)
+        if self.dom and self._dom_state and self._dom_state[0] == state[0]:
+            self.dom, self.dom_diff, self._next_element_index = carry_over_indices(
+                self.dom, dom, self._next_element_index, self.stable_ids
+            )
+        else:
+            self.dom = dom
+            self.dom_diff = None
+            self._next_element_index = len(dom.elements)
+        self._dom_state = state
+
+    async def _extract_dom(self, page: Page) -> DOM:
+        with trace_span(self.tracer, 'dom.extract', engine=self.dom_engine):
+            return await extract_dom(page, self.dom_engine, self.stable_ids, self.viewport_margin, self.tracer)
+
+    async def _extract_speculatively(self, page: Page) -> Optional[tuple[list, DOM]]:
+        """Extracts the DOM and returns it with the page state, or None if the page changed during extraction."""
+        try:
+            state = await page.evaluate(PAGE_STATE_SCRIPT)
+            dom = await self._extract_dom(page)
+            if state[1] is None or await page.evaluate(PAGE_STATE_SCRIPT) != state:
+                return None
+            return state, dom
+        except Exception as e:
+            # Typically the page navigated mid-extraction; update_dom extracts again
+            logger.debug(f"Speculative DOM extraction failed: {e}")
+            return None
+
+    async def _take_speculative_dom(self, page: Page) -> Optional[tuple[list, DOM]]:
+        """Returns the speculative extraction if the page is still in the state it was extracted from."""
+        task, self._speculative_task = self._speculative_task, None
+        if task is None:
+            return None
+        result = await task
+        if result is not None and await page.evaluate(PAGE_STATE_SCRIPT) == result[0]:
+            self.speculative_hits += 1
+            return result
+        self.speculative_misses += 1
+        return None
+
+    def _discard_speculative_dom(self) -> None:
+        if self._speculative_task is not None:
+            self._speculative_task.cancel()
+            self._speculative_task = None
+
+    async def get_scroll_info(self) -> dict:
+        """Scroll position, viewport height and document height of the page, in CSS pixels."""
+        page = self.get_page()
+        scroll_y, viewport_height, page_height = await page.evaluate(
+            '[scrollY, innerHeight, Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0)]'
+        )
+        return {
+            'scroll_y': round(scroll_y),
+            'viewport_height': viewport_height,
+            'page_height': page_height,
+            'pixels_below': max(round(page_height - scroll_y - viewport_height), 0),
+        }
+
+    async def scroll(self, pages: float = 1.0) -> str:
+        """
+        Scrolls by `pages` viewport heights, negative to scroll up. Pages that scroll an inner container
+        instead of the window are scrolled through the container under the middle of the viewport.
+        Waits for lazily loaded content before returning where the page is now.
+        """
+        page = self.get_page()
+        moved, window_scrolled = await page.evaluate(
+            """
+            (pages) => {
+                const distance = Math.round(window.innerHeight * 0.9 * pages);
+                const before = window.scrollY;
+                window.scrollBy(0, distance);
+                if (window.scrollY !== before) return [window.scrollY - before, true];
+                let el = document.elementFromPoint(window.innerWidth / 2, window.innerHeight / 2);
+                while (el && el !== document.body) {
+                    const style = window.getComputedStyle(el);
+                    if (/(auto|scroll)/.test(style.overflowY) && el.scrollHeight > el.clientHeight) {
+                        const start = el.scrollTop;
+                        el.scrollBy(0, distance);
+                        return [el.scrollTop - start, false];
+                    }
+                    el = el.parentElement;
+                }
+                return [0, false];
+            }
+            """,
+            pages,
+        )
+        await self.wait_for_page_load('scroll')
+        if not moved:
+            return f"Could not scroll {'down' if pages > 0 else 'up'}, already at the {'bottom' if pages > 0 else 'top'} of the page."
+        message = f"Scrolled {'down' if moved > 0 else 'up'} {abs(moved)}px."
+        if window_scrolled:
+            info = await self.get_scroll_info()
+            message += f" Now at {info['scroll_y']}px of {info['page_height']}px, {info['pixels_below']}px below the viewport."
+        return message
+
     async def click_element_by_index(self, index: int, timeout_ms: int = 10000):
         if index not in self.dom.element_map:
             raise Exception(
                 f'Element with index {index} does not exist - retry or use alternative actions'
             )
         xpath = self.dom.element_map[index]
-        await self._click_element_by_xpath(xpath)
+        await self._click_element_by_xpath(xpath, index)
 
     async def type_element_by_index(self, index: int, text: str) -> None:
         if index not in self.dom.element_map:
@@ -230,41 +667,50 @@ class Browser:
 					f'Element with index {index} does not exist - retry or use alternative actions'
 				)
         xpath = self.dom.element_map[index]
-        await self._input_text_by_xpath(xpath, text)
-    
-    async def _input_text_by_xpath(self, xpath: str, text: str):
+        await self._input_text_by_xpath(xpath, text, index)
+
+    async def _wait_for_element(self, xpath: str, index: Optional[int] = None):
+        """Finds the element by its stable id when there is one, by xpath otherwise or when the id is gone."""
         page = self.get_page()
+        if self.stable_ids and index is not None:
+            element = await page.query_selector(f'[{STABLE_ID_ATTRIBUTE}="{index}"]')
+            if element is not None and await element.is_visible():
+                return element
+            self.stable_id_fallbacks += 1
+        return await page.wait_for_selector(f'xpath={xpath}', timeout=10000, state='visible')
+    
+    async def _input_text_by_xpath(self, xpath: str, text: str, index: Optional[int] = None):
         try:
-            element = await page.wait_for_selector(f'xpath={xpath}', timeout=10000, state='visible')
+            element = await self._wait_for_element(xpath, index)
 
             if element is None:
                 raise Exception(f'Element with xpath: {xpath} not found')
             await element.scroll_into_view_if_needed()
             await element.fill('')
             await element.type(text)
-            await self.wait_for_page_load()
+            await self.wait_for_page_load('type')
 
         except Exception as e:
             raise Exception(
 				f'Failed to input text into element with xpath: {xpath}. Error: {str(e)}'
 			)
 
-    async def _click_element_by_xpath(self, xpath: str):
+    async def _click_element_by_xpath(self, xpath: str, index: Optional[int] = None):
         page = self.get_page()
         try:
-            element = await page.wait_for_selector(f'xpath={xpath}', timeout=10000, state='visible')
+            element = await self._wait_for_element(xpath, index)
             if element is None:
                 raise Exception(f'Element with xpath: {xpath} not found')
             await element.scroll_into_view_if_needed()
             try:
                 await element.click()
-                await self.wait_for_page_load()
+                await self.wait_for_page_load('click')
                 return
             except Exception:
                 pass
             try:
                 await page.evaluate('(el) => el.click()', element)
-                await self.wait_for_page_load()
+                await self.wait_for_page_load('click')
                 return
             except Exception as e:
                 raise Exception(f'Failed to click element: {str(e)}')
@@ -274,64 +720,175 @@ class Browser:
 
     async def take_screenshot(
         self,  full_page: bool = False
-    ) -> str:
+    ) -> Optional[str]:
         """
-        Returns a base64 encoded screenshot of the current page.
+        Returns a base64 encoded screenshot of the current page with the interactive elements labelled,
+        encoded as configured in self.screenshot_config. Returns None when skip_unchanged is set and the
+        page looks the same as in the last screenshot returned; the caller must keep that one in front of
+        the LLM (see Agent._retire_observation) or call forget_screenshot first.
+        Labels are drawn on the captured image from the rects recorded by the last update_dom, so the
+        page is not modified and it takes a single round trip to the browser.
         """
-        try: 
-            await self.wait_for_page_load()
+        raw_screenshot = await self.capture_screenshot(full_page)
+        return self.render_screenshot(raw_screenshot)
+
+    def forget_screenshot(self) -> None:
+        """Makes the next screenshot be sent whatever it looks like, e.g. for a new conversation."""
+        self._last_screenshot_hash = None
+        self._last_screenshot_digest = None
+
+    async def capture_screenshot(self, full_page: bool = False) -> tuple[bytes, Optional[tuple[float, float]]]:
+        """
+        Captures the page without labels. Returns the image and, for full page screenshots, the scroll
+        offset the element rects have to be shifted by. It does not depend on the DOM, so it can run
+        while update_dom is extracting; render_screenshot then labels it.
+        """
+        try:
             page = self.get_page()
-            await self.highlight_elements_in_page()
-            screenshot = await page.screenshot(full_page=full_page, animations='disabled')
-            screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
-            await self.remove_highlights()
-            return screenshot_b64
+            with trace_span(self.tracer, 'screenshot.capture', full_page=full_page):
+                if full_page:
+                    # Rects are relative to the viewport, the full page image starts at the top of the document
+                    screenshot, scroll = await asyncio.gather(
+                        page.screenshot(full_page=True, animations='disabled', scale='css'),
+                        page.evaluate('[scrollX, scrollY]'),
+                    )
+                    return screenshot, tuple(scroll)
+                return await page.screenshot(animations='disabled', scale='css'), None
+        except Exception as e:
+            raise Exception(f'Error While taking Screenshot: {str(e)}')
+
+    def render_screenshot(self, raw_screenshot: tuple[bytes, Optional[tuple[float, float]]]) -> Optional[str]:
+        """Labels, resizes and encodes a capture_screenshot result, see take_screenshot."""
+        try:
+            config = self.screenshot_config
+            screenshot, scroll = raw_screenshot
+            start_time = time.perf_counter()
+            if self.dom and self.dom.element_rects:
+                element_rects = self.dom.element_rects
+                if scroll:
+                    scroll_x, scroll_y = scroll
+                    element_rects = {
+                        index: [x + scroll_x, y + scroll_y, w, h] for index, (x, y, w, h) in element_rects.items()
+                    }
+                with trace_span(self.tracer, 'screenshot.labels', labels=len(element_rects)):
+                    image = draw_element_labels(screenshot, element_rects)
+            else:
+                image = load_image(screenshot)
+            with trace_span(self.tracer, 'screenshot.resize'):
+                image = prepare_image(image, config.grayscale, config.max_dimension)
+
+            if config.skip_unchanged:
+                frame_hash = perceptual_hash(image)
+                digest = frame_digest(image)
+                # Compared with the last screenshot sent, so small changes cannot add up over skipped frames.
+                # The hash is too coarse to see typed text or a ticked checkbox, the digest must agree too.
+                if (
+                    self._last_screenshot_hash is not None
+                    and hamming_distance(frame_hash, self._last_screenshot_hash) <= config.unchanged_threshold
+                    and digest_difference(digest, self._last_screenshot_digest) <= config.unchanged_tolerance
+                ):
+                    self._record_screenshot(image, 0, start_time, skipped=True)
+                    return None
+                self._last_screenshot_hash = frame_hash
+                self._last_screenshot_digest = digest
+
+            with trace_span(self.tracer, 'screenshot.encode', format=config.format):
+                encoded = encode_image(image, config.format, config.quality)
+            self._record_screenshot(image, len(encoded), start_time, skipped=False)
+            if self.tracer:
+                self.tracer.count('screenshot.bytes', len(encoded))
+            return base64.b64encode(encoded).decode('utf-8')
         except Exception as e:
             raise Exception(f'Error While taking Screenshot: {str(e)}')
 
+    def _record_screenshot(self, image, size: int, start_time: float, skipped: bool) -> None:
+        metric = ScreenshotMetric(
+            format=self.screenshot_config.format,
+            width=image.width,
+            height=image.height,
+            bytes=size,
+            encode_ms=(time.perf_counter() - start_time) * 1000,
+            skipped=skipped,
+        )
+        self.screenshot_metrics.append(metric)
+        logger.debug(
+            f'--Screenshot {metric.width}x{metric.height} {metric.format}: {metric.bytes} bytes, '
+            f'{metric.encode_ms:.1f} ms{" (skipped, unchanged)" if skipped else ""}'
+        )
+
+    def screenshot_summary(self) -> dict:
+        """Totals of self.screenshot_metrics, to tune the encoding for throughput."""
+        sent = [metric for metric in self.screenshot_metrics if not metric.skipped]
+        return {
+            'screenshots': len(self.screenshot_metrics),
+            'skipped': len(self.screenshot_metrics) - len(sent),
+            'total_bytes': sum(metric.bytes for metric in sent),
+            'avg_bytes': round(sum(metric.bytes for metric in sent) / len(sent)) if sent else 0,
+            'avg_encode_ms': round(
+                sum(metric.encode_ms for metric in self.screenshot_metrics) / len(self.screenshot_metrics), 1
+            ) if self.screenshot_metrics else 0.0,
+        }
+
+    def observation_summary(self) -> dict:
+        """Average stage timings of self.observation_metrics, to see which stage is on the critical path."""
+        metrics = self.observation_metrics
+        if not metrics:
+            return {'observations': 0}
+        fields = ['page_info_ms', 'dom_ms', 'screenshot_capture_ms', 'screenshot_render_ms', 'total_ms', 'serial_ms']
+        summary = {'observations': len(metrics)}
+        for field in fields:
+            summary[f'avg_{field}'] = round(sum(getattr(metric, field) for metric in metrics) / len(metrics), 1)
+        summary['speculative_dom_hits'] = self.speculative_hits
+        summary['speculative_dom_misses'] = self.speculative_misses
+        return summary
+
     async def highlight_elements_in_page(self):
+        """Outlines and labels the interactive elements in the page itself, e.g. for watching a headed run."""
         page = self.get_page()
         await self.remove_highlights()
-        script = """
-        const highlights = {
-        """
         try: 
-        # Build the highlights object with all selectors and indices
-            if(not self.dom and not self.dom.element_map):
+            if not self.dom:
                 raise Exception(f'Error when getting element map for highlighting')
-            for index, selector in self.dom.element_map.items():
-                # Adjusting the JavaScript code to accept variables
-                script += f'"{index}": "{selector}",\n'
-            script += """
-            };
-            
-            for (const [index, selector] of Object.entries(highlights)) {
-                const el = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                if (!el) continue;  // Skip if element not found
-                el.style.outline = "2px solid red";
-                el.setAttribute('browser-user-highlight-id', 'playwright-highlight');
-                
-                const label = document.createElement("div");
-                label.className = 'playwright-highlight-label';
-                label.style.position = "fixed";
-                label.style.background = "red";
-                label.style.color = "white";
-                label.style.padding = "2px 6px";
-                label.style.borderRadius = "10px";
-                label.style.fontSize = "12px";
-                label.style.zIndex = "9999999";
-                label.textContent = index;
-                const rect = el.getBoundingClientRect();
-                label.style.top = (rect.top - 20) + "px";
-                label.style.left = rect.left + "px";
-                document.body.appendChild(label);
-            }
-            """
-
-            await page.evaluate(script)
+            if not self.dom.element_map:
+                return
+            # The element map is passed as an argument so xpaths never have to be escaped into the script
+            highlights = {str(index): xpath for index, xpath in self.dom.element_map.items()}
+            with trace_span(self.tracer, 'highlight', elements=len(highlights)):
+                await self._draw_highlights(page, highlights)
         except Exception as e:
             raise Exception(f'Error While Highlighting: {str(e)}')
 
+    async def _draw_highlights(self, page: Page, highlights: dict[str, str]) -> None:
+        await page.evaluate(
+            """
+            ([highlights, idAttribute]) => {
+                for (const [index, selector] of Object.entries(highlights)) {
+                    const el = (idAttribute && document.querySelector(`[${idAttribute}="${index}"]`))
+                        || document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                    if (!el) continue;  // Skip if element not found
+                    el.style.outline = "2px solid red";
+                    el.setAttribute('browser-user-highlight-id', 'playwright-highlight');
+
+                    const label = document.createElement("div");
+                    label.className = 'playwright-highlight-label';
+                    label.style.position = "fixed";
+                    label.style.background = "red";
+                    label.style.color = "white";
+                    label.style.padding = "2px 6px";
+                    label.style.borderRadius = "10px";
+                    label.style.fontSize = "12px";
+                    label.style.zIndex = "9999999";
+                    label.textContent = index;
+                    const rect = el.getBoundingClientRect();
+                    label.style.top = (rect.top - 20) + "px";
+                    label.style.left = rect.left + "px";
+                    document.body.appendChild(label);
+                }
+            }
+            """,
+            [highlights, STABLE_ID_ATTRIBUTE if self.stable_ids else None],
+        )
+
     async def remove_highlights(self):
         try: 
             page = self.get_page()
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import BaseModel
+from playwright.async_api import async_playwright, Browser as PlaywrightBrowser, Playwright
+from auto_nav.browser import Browser, LaunchProfile, launch_chromium
+
+logger = logging.getLogger(__name__)
+
+class PoolStats(BaseModel):
+    acquisitions: int = 0
+    launches: int = 0               # Chromium processes started, including recycling
+    recycles: int = 0
+    reuses: int = 0                 # acquisitions served by a process that had already run a task
+    launches_avoided: int = 0       # compared to one cold launch per acquisition
+    total_wait_s: float = 0.0       # time spent in acquire(), waiting for a free slot and opening the context
+    max_wait_s: float = 0.0
+
+class _PooledProcess:
+    def __init__(self, browser: PlaywrightBrowser):
+        self.browser = browser
+        self.active = 0             # contexts currently handed out
+        self.tasks = 0              # contexts handed out since launch
+        self.draining = False       # waiting for its active contexts to finish before being recycled
+
+class BrowserPool:
+    """
+    Keeps `size` Chromium processes launched with `profile` running and hands out Browser instances backed by a fresh
+    BrowserContext on one of them, which takes milliseconds instead of a cold launch.
+    A process is recycled once it has served max_tasks_per_browser contexts or, on Linux,
+    once its process tree uses more than max_memory_mb.
+
+        pool = BrowserPool(size=2, profile=LaunchProfile.lean())
+        await pool.start()
+        async with pool.browser() as browser:
+            ...
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        contexts_per_browser: int = 1,
+        profile: Optional[LaunchProfile] = None,
+        max_tasks_per_browser: int = 50,
+        max_memory_mb: Optional[float] = None,
+        browser_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.profile = profile or LaunchProfile()
+        self.max_tasks_per_browser = max_tasks_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.browser_kwargs = browser_kwargs or {}
+        self.stats = PoolStats()
+        self._playwright: Optional[Playwright] = None
+        self._processes: List[_PooledProcess] = []
+        self._leases: Dict[int, _PooledProcess] = {}   # id(Browser) -> process it runs on
+        self._available = asyncio.Condition()
+        self._relaunching = 0       # recycled processes out of the pool while their replacement starts
+
+    async def start(self) -> None:
+        """Pre-launches every process in the pool."""
+        self._playwright = await async_playwright().start()
+        self._processes = list(await asyncio.gather(*(self._launch() for _ in range(self.size))))
+        logger.info(f"Browser pool started with {self.size} process(es).")
+
+    async def close(self) -> None:
+        for process in self._processes:
+            await self._close_process(process)
+        self._processes = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def acquire(self) -> Browser:
+        """Returns a started Browser on a fresh context, waiting until a process has a free slot."""
+        start_time = time.monotonic()
+        async with self._available:
+            await self._available.wait_for(lambda: self._free_process() or self._exhausted())
+            process = self._free_process()
+            if process is None:
+                raise RuntimeError('No browser process left in the pool, relaunching them failed')
+            process.active += 1
+            process.tasks += 1
+        browser = Browser(playwright_browser=process.browser, profile=self.profile, **self.browser_kwargs)
+        try:
+            await browser.start()
+        except Exception:
+            await self._return(process)
+            raise
+        self._leases[id(browser)] = process
+
+        waited = time.monotonic() - start_time
+        self.stats.acquisitions += 1
+        self.stats.reuses += process.tasks > 1
+        self.stats.launches_avoided = max(self.stats.acquisitions - self.stats.launches, 0)
+        self.stats.total_wait_s += waited
+        self.stats.max_wait_s = max(self.stats.max_wait_s, waited)
+        return browser
+
+    async def release(self, browser: Browser) -> None:
+        """Closes the browser's context and recycles its process if it reached a limit."""
+        process = self._leases.pop(id(browser), None)
+        await browser.close()
+        if process is None:
+            return
+        if not process.draining and await self._should_recycle(process):
+            process.draining = True
+        await self._return(process)
+
+    @asynccontextmanager
+    async def browser(self) -> AsyncIterator[Browser]:
+        browser = await self.acquire()
+        try:
+            yield browser
+        finally:
+            await self.release(browser)
+
+    def _free_process(self) -> Optional[_PooledProcess]:
+        candidates = [p for p in self._processes if not p.draining and p.active < self.contexts_per_browser]
+        return min(candidates, key=lambda p: p.active, default=None)
+
+    def _exhausted(self) -> bool:
+        return not self._processes and not self._relaunching
+
+    async def _return(self, process: _PooledProcess) -> None:
+        async with self._available:
+            process.active -= 1
+            recycle = process.draining and process.active == 0 and process in self._processes
+            if recycle:
+                # Out of the pool while it is replaced, so it is neither handed out nor recycled twice
+                self._processes.remove(process)
+                self._relaunching += 1
+        try:
+            if recycle:
+                await self._recycle(process)
+        finally:
+            # Waiters must hear about the freed slot, or the lost one, whatever happened to the relaunch
+            async with self._available:
+                if recycle:
+                    self._relaunching -= 1
+                self._available.notify_all()
+
+    async def _should_recycle(self, process: _PooledProcess) -> bool:
+        if process.tasks >= self.max_tasks_per_browser:
+            return True
+        if self.max_memory_mb is not None:
+            memory_mb = await process_tree_memory_mb(process.browser)
+            return memory_mb is not None and memory_mb > self.max_memory_mb
+        return False
+
+    async def _recycle(self, process: _PooledProcess) -> None:
+        logger.info(f"Recycling browser process after {process.tasks} task(s).")
+        await self._close_process(process)
+        try:
+            replacement = await self._launch()
+        except Exception as e:
+            # The pool goes on with one process less rather than failing the task that released it
+            logger.error(f"Could not relaunch a recycled browser process, {len(self._processes)} left in the pool: {e}")
+            return
+        self._processes.append(replacement)
+        self.stats.recycles += 1
+
+    async def _launch(self) -> _PooledProcess:
+        browser = await launch_chromium(self._playwright, self.profile)
+        self.stats.launches += 1
+        return _PooledProcess(browser)
+
+    async def _close_process(self, process: _PooledProcess) -> None:
+        try:
+            await process.browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser: {e}")
+
+async def process_tree_memory_mb(browser: PlaywrightBrowser) -> Optional[float]:
+    """Resident memory of all processes of a Chromium instance, read from /proc. None where that is unavailable."""
+    try:
+        session = await browser.new_browser_cdp_session()
+        info = await session.send('SystemInfo.getProcessInfo')
+        await session.detach()
+    except Exception as e:
+        logger.debug(f"Could not read browser process info: {e}")
+        return None
+    total_kb = 0
+    for process in info.get('processInfo', []):
+        status = Path(f"/proc/{process['id']}/status")
+        try:
+            for line in status.read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total_kb += int(line.split()[1])
+                    break
+        except (OSError, ValueError):
+            return None
+    return total_kb / 1024
@@ -14,6 +14,13 @@ class TypeByIndexSchema(BaseModel):
 class NavigateSchema(BaseModel):
     url: str = Field(..., description="The complete URL to navigate to (e.g., 'https://www.google.com').")
 
+class ScrollSchema(BaseModel):
+    pages: float = Field(1.0, description="How many screens to scroll, e.g. 0.5 for half a screen. Defaults to one screen.")
+
+# Tools that only read browser state. Consecutive calls to them can run concurrently,
+# every other tool changes the page and runs strictly in the order the LLM asked for.
+READ_ONLY_TOOLS = {'get_current_url', 'get_page_title'}
+
 # --- Browser Interaction Helper ---
 
 async def execute_browser_tool(browser: Browser, coro):
@@ -65,7 +72,15 @@ async def press_enter_key(browser: Browser) -> str:
     print("Tool: Pressing Enter key")
     page = browser.get_page()
     await execute_browser_tool(browser, page.keyboard.press('Enter'))
-    await browser.wait_for_page_load()
+    await browser.wait_for_page_load('press_enter')
+
+async def scroll_down(browser: Browser, pages: float = 1.0) -> str:
+    print(f"Tool: Scrolling down {pages} page(s)")
+    return await execute_browser_tool(browser, browser.scroll(abs(pages)))
+
+async def scroll_up(browser: Browser, pages: float = 1.0) -> str:
+    print(f"Tool: Scrolling up {pages} page(s)")
+    return await execute_browser_tool(browser, browser.scroll(-abs(pages)))
 
 async def click_element_by_index(browser: Browser, index: int) -> str:
     print(f"Tool: Clicking element by index '{index}'")
@@ -118,6 +133,18 @@ def create_browser_tools(browser: Browser) -> List[Tool]:
             func=lambda: press_enter_key(browser),
             name="press_enter_key",
             description="Simulates pressing the Enter key on the keyboard. Use this after typing text into a search bar or form field to submit it.",
+        ),
+        Tool.from_function(
+            func=lambda pages=1.0: scroll_down(browser, pages),
+            name="scroll_down",
+            description="Scroll down to reveal more of the page. Only the elements in view are listed, scroll to find the others.",
+            args_schema=ScrollSchema
+        ),
+        Tool.from_function(
+            func=lambda pages=1.0: scroll_up(browser, pages),
+            name="scroll_up",
+            description="Scroll back up the page.",
+            args_schema=ScrollSchema
         ),
          Tool.from_function(
             func=lambda index: click_element_by_index(browser, index),
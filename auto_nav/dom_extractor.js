@@ -0,0 +1,260 @@
+(options = {}) => {
+    // Walks the live DOM once and returns the same items get_elements builds from
+    // the BeautifulSoup parse, with visibility and top-element checks already applied.
+    const DENY_LIST = new Set(['svg', 'iframe', 'script', 'style', 'link', 'meta']);
+    const INTERACTIVE_TAGS = new Set([
+        'a', 'button', 'details', 'embed', 'input', 'label', 'menu',
+        'menuitem', 'object', 'select', 'textarea', 'summary',
+    ]);
+    const INTERACTIVE_ROLES = new Set([
+        'button', 'menu', 'menuitem', 'link', 'checkbox', 'radio', 'slider', 'tab',
+        'tabpanel', 'textbox', 'combobox', 'grid', 'listbox', 'option', 'progressbar',
+        'scrollbar', 'searchbox', 'switch', 'tree', 'treeitem', 'spinbutton', 'tooltip',
+        'menuitemcheckbox', 'menuitemradio',
+    ]);
+    const ESSENTIAL_ATTRIBUTES = [
+        'id', 'class', 'href', 'src', 'readonly', 'disabled', 'checked', 'selected',
+        'role', 'type', 'name', 'value', 'placeholder', 'title', 'alt', 'for', 'autocomplete',
+    ];
+    const MAX_TEXT_LENGTH = options.maxTextLength || 250;
+    const MAX_ATTRIBUTE_LENGTH = options.maxAttributeLength || 25;
+    // When set, elements are tagged with a stable id in this attribute, which becomes their index
+    const STABLE_ID_ATTRIBUTE = options.stableIdAttribute || null;
+    // When set, only elements within this many pixels of the viewport are walked, checked and returned
+    const VIEWPORT_MARGIN = options.viewportMargin ?? null;
+
+    const capText = (text, maxLength) => {
+        if (text.length > maxLength) {
+            const half = Math.floor(maxLength / 2);
+            return text.slice(0, half) + '...' + text.slice(-half);
+        }
+        return text;
+    };
+
+    const isAccepted = (el) => !DENY_LIST.has(el.localName);
+
+    // Concatenated stripped text of a subtree, the equivalent of get_text(strip=True).
+    const subtreeText = new Map();
+    const textOf = (el) => {
+        let cached = subtreeText.get(el);
+        if (cached !== undefined) return cached;
+        cached = '';
+        for (const child of el.childNodes) {
+            if (child.nodeType === Node.TEXT_NODE) {
+                cached += child.data.trim();
+            } else if (child.nodeType === Node.ELEMENT_NODE && isAccepted(child)) {
+                cached += textOf(child);
+            }
+        }
+        subtreeText.set(el, cached);
+        return cached;
+    };
+
+    const textFromAllChildren = (el) => {
+        const pieces = [];
+        const stack = Array.from(el.childNodes).reverse();
+        while (stack.length) {
+            const node = stack.pop();
+            if (node.nodeType === Node.TEXT_NODE) {
+                pieces.push(node.data.trim());
+            } else if (node.nodeType === Node.ELEMENT_NODE && isAccepted(node)) {
+                pieces.push(textOf(node));
+                for (let i = node.childNodes.length - 1; i >= 0; i--) stack.push(node.childNodes[i]);
+            }
+        }
+        return capText(pieces.join('\n').trim(), MAX_TEXT_LENGTH);
+    };
+
+    const isInteractive = (el) => (
+        INTERACTIVE_TAGS.has(el.localName)
+        || INTERACTIVE_ROLES.has(el.getAttribute('role'))
+        || INTERACTIVE_ROLES.has(el.getAttribute('aria-role'))
+        || el.getAttribute('tabindex') === '0'
+    );
+
+    // The shape is checked first: textOf walks the whole subtree, which for a wrapper can be most of the page
+    const isLeaf = (el) => {
+        const children = el.childNodes;
+        if (!(children.length === 0 || (children.length === 1 && children[0].nodeType === Node.TEXT_NODE))) return false;
+        return Boolean(textOf(el));
+    };
+
+    const isActive = (el) => !(
+        el.hasAttribute('disabled')
+        || el.hasAttribute('hidden')
+        || el.getAttribute('aria-disabled') === 'true'
+    );
+
+    // [name, value] pairs of the essential attributes, then aria-* and data-*, with full values
+    const elementAttributes = (el) => {
+        const attrs = [];
+        for (const name of ESSENTIAL_ATTRIBUTES) {
+            if (!el.hasAttribute(name)) continue;
+            let value = el.getAttribute(name);
+            if (name === 'class') value = value.split(/\s+/).filter(Boolean).join(' ');
+            attrs.push([name, value]);
+        }
+        for (const attr of el.attributes) {
+            if (attr.name === STABLE_ID_ATTRIBUTE) continue;
+            if (attr.name.startsWith('aria-') || attr.name.startsWith('data-')) {
+                attrs.push([attr.name, attr.value]);
+            }
+        }
+        return attrs;
+    };
+
+    const formatAttributes = (attrs) => attrs.map(([name, value]) => (
+        `${name}="${ESSENTIAL_ATTRIBUTES.includes(name) ? capText(value, MAX_ATTRIBUTE_LENGTH) : value}"`
+    )).join(' ');
+
+    const inRange = (rect) => VIEWPORT_MARGIN === null || (
+        rect.bottom >= -VIEWPORT_MARGIN
+        && rect.top <= window.innerHeight + VIEWPORT_MARGIN
+        && rect.right >= -VIEWPORT_MARGIN
+        && rect.left <= window.innerWidth + VIEWPORT_MARGIN
+    );
+    const inViewport = (rect) => (
+        rect.bottom > 0 && rect.top < window.innerHeight && rect.right > 0 && rect.left < window.innerWidth
+    );
+
+    // Subtrees whose box lies entirely outside the range are not walked at all, so the work per
+    // extraction is bounded by what is near the viewport, not by the length of the page. Boxes
+    // without a size (display: contents, collapsed wrappers) are walked, their children may have one.
+    const isOutOfRange = (el) => {
+        if (VIEWPORT_MARGIN === null) return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && !inRange(rect);
+    };
+
+    // Returns the element's viewport rect when it is visible and on top, null otherwise
+    const visibleTopRect = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (!inRange(rect)) return null;
+        const style = window.getComputedStyle(el);
+        const isVisible = el.offsetWidth > 0
+            && el.offsetHeight > 0
+            && style.visibility !== 'hidden'
+            && style.display !== 'none';
+        if (!isVisible) return null;
+
+        const points = [
+            {x: rect.left + rect.width * 0.25, y: rect.top + rect.height * 0.25},
+            {x: rect.left + rect.width * 0.75, y: rect.top + rect.height * 0.25},
+            {x: rect.left + rect.width * 0.25, y: rect.top + rect.height * 0.75},
+            {x: rect.left + rect.width * 0.75, y: rect.top + rect.height * 0.75},
+            {x: rect.left + rect.width / 2, y: rect.top + rect.height / 2},
+        ];
+        // Points outside the viewport cannot be hit-tested, elements in the margin count as on top
+        const isTopElement = (VIEWPORT_MARGIN !== null && !inViewport(rect)) || points.some(point => {
+            let current = document.elementFromPoint(point.x, point.y);
+            while (current && current !== document.body) {
+                if (current === el) return true;
+                current = current.parentElement;
+            }
+            return false;
+        });
+        return isTopElement ? [rect.left, rect.top, rect.width, rect.height] : null;
+    };
+
+    // Keeps the element's id from earlier extractions; an element cloned with its attribute gets a new one
+    const seenIds = new Set();
+    const stableId = (el) => {
+        let id = el.getAttribute(STABLE_ID_ATTRIBUTE);
+        if (id === null || seenIds.has(id)) {
+            window.__autoNavNextId = window.__autoNavNextId || 0;
+            id = String(window.__autoNavNextId++);
+            el.setAttribute(STABLE_ID_ATTRIBUTE, id);
+        }
+        seenIds.add(id);
+        return Number(id);
+    };
+
+    const isTextVisible = (textNode, parent) => {
+        const range = document.createRange();
+        range.selectNodeContents(textNode);
+        const rect = range.getBoundingClientRect();
+        return (
+            rect.width !== 0
+            && rect.height !== 0
+            && rect.top >= -(VIEWPORT_MARGIN || 0)
+            && rect.top <= window.innerHeight + (VIEWPORT_MARGIN || 0)
+            && parent.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})
+        );
+    };
+
+    if (!document.body) return [];
+
+    // Same pre-order traversal as get_elements; xpaths come from per-parent tag counters.
+    const candidates = [];              // [order, element, xpath, depth]
+    const textByParent = new Map();     // parent element -> [order, textNode, xpath, depth]
+    let order = 0;
+
+    const stack = [];
+    const pushChildren = (parent, parentXpath, depth) => {
+        const counters = new Map();
+        const entries = [];
+        for (const child of parent.childNodes) {
+            let xpath = null;
+            if (child.nodeType === Node.ELEMENT_NODE) {
+                const count = (counters.get(child.localName) || 0) + 1;
+                counters.set(child.localName, count);
+                xpath = `${parentXpath ? parentXpath + '/' : '//'}${child.localName}[${count}]`;
+            }
+            entries.push([child, xpath, parent, parentXpath, depth]);
+        }
+        for (let i = entries.length - 1; i >= 0; i--) stack.push(entries[i]);
+    };
+    pushChildren(document.body, null, 0);
+
+    while (stack.length) {
+        const [node, xpath, parent, parentXpath, parentDepth] = stack.pop();
+        if (node.nodeType === Node.ELEMENT_NODE) {
+            if (!isAccepted(node) || isOutOfRange(node)) continue;
+            pushChildren(node, xpath, parentDepth + 1);
+            if ((isInteractive(node) || isLeaf(node)) && isActive(node)) {
+                candidates.push([order++, node, xpath, parentDepth + 1]);
+            }
+        } else if (node.nodeType === Node.TEXT_NODE && node.data.trim() && parentXpath) {
+            // Only reached under parents in range, so off-screen text is never measured
+            textByParent.set(parent, [order++, node, parentXpath, parentDepth]);
+        }
+    }
+
+    const results = [];
+    for (const [itemOrder, el, xpath, depth] of candidates) {
+        const rect = visibleTopRect(el);
+        if (!rect) continue;
+        const attributeItems = elementAttributes(el);
+        const attributes = formatAttributes(attributeItems);
+        const tag = el.localName;
+        const innerText = textFromAllChildren(el);
+        const item = {
+            order: itemOrder,
+            xpath: xpath,
+            text: `<${tag}${attributes ? ' ' + attributes : ''}>${innerText}</${tag}>`,
+            depth: depth,
+            isTextOnly: false,
+            rect: rect,
+            tag: tag,
+            attributes: attributeItems,
+            innerText: innerText,
+        };
+        if (STABLE_ID_ATTRIBUTE) item.stableId = stableId(el);
+        results.push(item);
+    }
+    for (const [parent, [itemOrder, textNode, xpath, depth]] of textByParent) {
+        let visible = false;
+        try {
+            visible = isTextVisible(textNode, parent);
+        } catch (e) {
+            continue;
+        }
+        if (!visible) continue;
+        const text = capText(textNode.data.trim(), MAX_TEXT_LENGTH);
+        if (text) {
+            results.push({order: itemOrder, xpath: xpath, text: text, depth: depth, isTextOnly: true});
+        }
+    }
+    results.sort((a, b) => a.order - b.order);
+    return results;
+}
@@ -1,139 +1,306 @@
 from playwright.async_api import Page
-from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+from bs4 import BeautifulSoup, CData, NavigableString, PageElement, Tag
 from typing import Optional
 from typing import Dict, List
 from pydantic import BaseModel
+from collections import Counter
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from functools import lru_cache
+import importlib.resources
+from auto_nav.tracing import Tracer, trace_span
 import json
 
-class ElementCheckResult(BaseModel):
+# With stable ids, extracted elements are tagged in the page with this attribute. The value is the
+# element's index, it survives re-extractions and lets actions find the element without an XPath.
+STABLE_ID_ATTRIBUTE = 'data-autonav-id'
+
+# Returns the element's stable id, assigning the next free one of the document if it has none.
+# `seen` holds the ids of this extraction, so an element cloned with its attribute gets a new id.
+_STABLE_ID_SCRIPT = """
+            const stableId = (element, seen) => {
+                let id = element.getAttribute('%s');
+                if (id === null || seen.has(id)) {
+                    window.__autoNavNextId = window.__autoNavNextId || 0;
+                    id = String(window.__autoNavNextId++);
+                    element.setAttribute('%s', id);
+                }
+                seen.add(id);
+                return Number(id);
+            };
+""" % (STABLE_ID_ATTRIBUTE, STABLE_ID_ATTRIBUTE)
+
+# The records built for every node of the page are slotted dataclasses: pydantic validation and
+# per-instance dicts add up on pages with thousands of nodes. DOM and DomDiff, the types handed to
+# the rest of the code, stay pydantic models but are built with model_construct from trusted values.
+
+@dataclass(slots=True)
+class ElementCheckResult:
 	xpath: str
 	isVisible: bool
 	isTopElement: bool
+	rect: Optional[list[float]] = None  # [x, y, width, height] in viewport CSS pixels
+	stableId: Optional[int] = None
 
-class TextCheckResult(BaseModel):
+@dataclass(slots=True)
+class TextCheckResult:
 	xpath: str
 	isVisible: bool
 
-class BatchCheckResults(BaseModel):
+@dataclass(slots=True)
+class BatchCheckResults:
 	elements: Dict[str, ElementCheckResult]
 	texts: Dict[str, TextCheckResult]
 
-class DomContentItem(BaseModel):
+@dataclass(slots=True)
+class DomContentItem:
 	index: int
 	text: str
 	is_text_only: bool
 	depth: int
+	# The parts `text` is built from, for interactive elements; used by the compact serialization
+	tag: Optional[str] = None
+	attributes: Optional[list[tuple[str, str]]] = None  # (name, value) pairs, uncapped values
+	inner_text: Optional[str] = None
 
 class DOM(BaseModel):
 	elements: list[DomContentItem]
 	element_map: dict[int, str]
-
-async def get_elements(page:Page) -> DOM:
+	element_rects: dict[int, list[float]] = {}  # index -> [x, y, width, height] captured during extraction
+
+class DomDiff(BaseModel):
+	added: list[DomContentItem]
+	removed: list[DomContentItem]
+	unchanged: int
+
+async def get_elements(
+    page:Page, stable_ids: bool = False, viewport_margin: Optional[int] = None, tracer: Optional[Tracer] = None
+) -> DOM:
+    if viewport_margin is not None:
+        # The whole document would still be serialized and parsed on every scroll
+        raise ValueError("viewport_margin requires the 'js' DOM engine")
     await page.wait_for_load_state('load')
-    html = await page.content()
-    soup = BeautifulSoup(html, 'html.parser')
-
-    output_items: list[DomContentItem] = []
-    element_map: dict[int, str] = {}
-    current_index = 0
-    interactive_elements: dict[str, tuple[Tag, int]] = {}  # xpath -> (element, order)
-    text_nodes: dict[str, tuple[NavigableString, int]] = {}  # xpath -> (text_node, order)
-    xpath_order_counter = 0  # Track order of appearance
-
-    dom_queue: list[tuple[PageElement, list, Optional[str]]] = (
-        [(element, [], None) for element in reversed(list(soup.body.children))]
-        if soup.body
-        else []
-    )
-
-    # First pass: collect all elements that need checking
-    while dom_queue:
-        element, path_indices, parent_xpath = dom_queue.pop()
-
-        if isinstance(element, Tag):
-            if not _is_element_accepted(element):
-                element.decompose()
-                continue
+    with trace_span(tracer, 'dom.content'):
+        html = await page.content()
+    with trace_span(tracer, 'dom.parse', html_bytes=len(html)):
+        soup = BeautifulSoup(html, 'html.parser')
 
-            siblings = (
-                list(element.parent.find_all(element.name, recursive=False))
-                if element.parent
-                else []
-            )
-            sibling_index = siblings.index(element) + 1 if siblings else 1
-            current_path = path_indices + [(element.name, sibling_index)]
-            element_xpath = '//' + '/'.join(f'{tag}[{idx}]' for tag, idx in current_path)
-
-            # Add children to queue with their path information
-            for child in reversed(list(element.children)):
-                dom_queue.append((child, current_path, element_xpath))  # Pass parent's xpath
-
-            # Collect interactive elements with their order
-            if (
-                _is_interactive_element(element) or _is_leaf_element(element)
-            ) and _is_active(element):
-                interactive_elements[element_xpath] = (element, xpath_order_counter)
-                xpath_order_counter += 1
-
-        elif isinstance(element, NavigableString) and element.strip():
-            if element.parent and element.parent not in [e[0] for e in dom_queue]:
-                if parent_xpath:
-                    text_nodes[parent_xpath] = (element, xpath_order_counter)
-                    xpath_order_counter += 1
+        output_items: list[DomContentItem] = []
+        element_map: dict[int, str] = {}
+        element_rects: dict[int, list[float]] = {}
+        interactive_elements, text_nodes = _collect_nodes(soup.body)
 
     # Batch check all elements
-    element_results = await _batch_check_elements(page, interactive_elements)
-    text_results = await _batch_check_texts(page, text_nodes)
+    with trace_span(tracer, 'dom.visibility_check', candidates=len(interactive_elements)):
+        element_results = await _batch_check_elements(page, interactive_elements, stable_ids)
+    with trace_span(tracer, 'dom.text_check', candidates=len(text_nodes)):
+        text_results = await _batch_check_texts(page, text_nodes)
 
     # Create ordered results
     ordered_results: list[
-        tuple[int, str, bool, str, int, bool]
-    ] = []  # [(order, xpath, is_clickable, content, depth, is_text_only), ...]
+        tuple[int, str, bool, str, int, bool, Optional[list[float]], Optional[int], Optional[tuple]]
+    ] = []  # [(order, xpath, is_clickable, content, depth, is_text_only, rect, stable_id, (tag, attributes, text)), ...]
+
+    # Capped text of every visible interactive element, built in one bottom-up pass
+    visible_elements = [
+        element
+        for xpath, (element, _, _) in interactive_elements.items()
+        if xpath in element_results.elements
+    ]
+    with trace_span(tracer, 'dom.texts'):
+        element_texts = _aggregate_texts(soup.body, {id(element) for element in visible_elements})
 
     # Process interactive elements
-    for xpath, (element, order) in interactive_elements.items():
+    for xpath, (element, order, depth) in interactive_elements.items():
         if xpath in element_results.elements:
             result = element_results.elements[xpath]
             if result.isVisible and result.isTopElement:
-                text_content = _extract_text_from_all_children(element)
+                text_content = element_texts[id(element)]
                 tag_name = element.name
-                attributes = _get_essential_attributes(element)
+                attribute_items = _get_element_attributes(element)
+                attributes = _format_attributes(attribute_items)
                 output_string = f"<{tag_name}{' ' + attributes if attributes else ''}>{text_content}</{tag_name}>"
-
-                depth = len(xpath.split('/')) - 2
-                ordered_results.append((order, xpath, True, output_string, depth, False))
+                fields = (tag_name, attribute_items, text_content)
+                ordered_results.append((order, xpath, True, output_string, depth, False, result.rect, result.stableId, fields))
 
     # Process text nodes
-    for xpath, (text_node, order) in text_nodes.items():
+    for xpath, (text_node, order, depth) in text_nodes.items():
         if xpath in text_results.texts:
             result = text_results.texts[xpath]
             if result.isVisible:
                 text_content = _cap_text_length(text_node.strip())
                 if text_content:
-                    depth = len(xpath.split('/')) - 2
-                    ordered_results.append((order, xpath, False, text_content, depth, True))
+                    ordered_results.append((order, xpath, False, text_content, depth, True, None, None, None))
 
     # Sort by original order
     ordered_results.sort(key=lambda x: x[0])
 
     # Build final output maintaining order
-    for i, (_, xpath, is_clickable, content, depth, is_text_only) in enumerate(ordered_results):
+    for i, (_, xpath, is_clickable, content, depth, is_text_only, rect, stable_id, fields) in enumerate(ordered_results):
+        index = stable_id if stable_id is not None else i
+        tag, attributes, inner_text = fields or (None, None, None)
         output_items.append(
             DomContentItem(
-                index=i,
+                index=index,
                 text=content,
                 # clickable=is_clickable,
                 depth=depth,
                 is_text_only=is_text_only,
+                tag=tag,
+                attributes=attributes,
+                inner_text=inner_text,
             )
         )
         if not is_text_only:
-            element_map[i] = xpath
+            element_map[index] = xpath
+            if rect:
+                element_rects[index] = rect
 
-    return DOM(elements=output_items, element_map=element_map)
+    if tracer:
+        tracer.count('dom.elements', len(element_map), engine='soup')
+    return DOM.model_construct(elements=output_items, element_map=element_map, element_rects=element_rects)
+
+async def get_elements_js(
+    page:Page, stable_ids: bool = False, viewport_margin: Optional[int] = None, tracer: Optional[Tracer] = None
+) -> DOM:
+    """
+    Builds the same DOM as get_elements by walking the live DOM once inside the page.
+    Visibility and top-element checks are applied in the same pass, so there is no
+    HTML serialization, re-parsing or XPath re-resolution.
+    """
+    await page.wait_for_load_state('load')
+    with trace_span(tracer, 'dom.extract_js'):
+        results = await page.evaluate(
+            _load_extractor_script(),
+            {'stableIdAttribute': STABLE_ID_ATTRIBUTE if stable_ids else None, 'viewportMargin': viewport_margin},
+        )
+
+    output_items: list[DomContentItem] = []
+    element_map: dict[int, str] = {}
+    element_rects: dict[int, list[float]] = {}
+    for i, result in enumerate(results):
+        index = result.get('stableId', i)
+        output_items.append(
+            DomContentItem(
+                index=index,
+                text=result['text'],
+                depth=result['depth'],
+                is_text_only=result['isTextOnly'],
+                tag=result.get('tag'),
+                attributes=result.get('attributes'),
+                inner_text=result.get('innerText'),
+            )
+        )
+        if not result['isTextOnly']:
+            element_map[index] = result['xpath']
+            element_rects[index] = result['rect']
+
+    if tracer:
+        tracer.count('dom.elements', len(element_map), engine='js')
+    return DOM.model_construct(elements=output_items, element_map=element_map, element_rects=element_rects)
+
+DOM_ENGINES = {
+    'soup': get_elements,
+    'js': get_elements_js,
+}
+
+async def extract_dom(
+    page:Page,
+    engine: str = 'soup',
+    stable_ids: bool = False,
+    viewport_margin: Optional[int] = None,
+    tracer: Optional[Tracer] = None,
+) -> DOM:
+    """
+    Extracts the DOM with the given engine ('soup' or 'js'). With stable_ids, element indices are
+    the ids tagged in the page (see STABLE_ID_ATTRIBUTE) instead of positions.
+    With viewport_margin, subtrees whose box is more than that many pixels outside the viewport are
+    not walked, and only elements within the range are checked and listed; the ones in the margin
+    cannot be hit-tested, so they are not checked for being covered. Descendants positioned outside
+    an out-of-range ancestor's box (a fixed popup inside a footer) are missed.
+    Only the 'js' engine supports it: the 'soup' engine parses the whole document whatever the margin.
+    With a tracer, the stages of the extraction are recorded as spans.
+    """
+    if engine not in DOM_ENGINES:
+        raise ValueError(f"Unknown DOM engine '{engine}'. Expected one of: {', '.join(DOM_ENGINES)}")
+    return await DOM_ENGINES[engine](page, stable_ids, viewport_margin, tracer)
+
+@lru_cache(maxsize=1)
+def _load_extractor_script() -> str:
+    """Load the in-page extractor used by get_elements_js."""
+    with importlib.resources.files('auto_nav').joinpath('dom_extractor.js').open('r') as f:
+        return f.read()
+
+def _collect_nodes(
+    body: Optional[Tag],
+) -> tuple[dict[str, tuple[Tag, int, int]], dict[str, tuple[NavigableString, int, int]]]:
+    """
+    Walks the parsed body in document order and collects the elements and text nodes that need
+    checking in the page. XPaths and depth are built from per-parent tag counters while children
+    are queued, so each node is visited once regardless of how many siblings it has.
+    """
+    interactive_elements: dict[str, tuple[Tag, int, int]] = {}  # xpath -> (element, order, depth)
+    text_nodes: dict[str, tuple[NavigableString, int, int]] = {}  # parent xpath -> (text_node, order, parent depth)
+    xpath_order_counter = 0  # Track order of appearance
+
+    # (node, xpath of the node if it is a tag, xpath of its parent, depth of the node)
+    dom_queue: list[tuple[PageElement, Optional[str], Optional[str], int]] = []
+    queued_tags: set[int] = set()  # ids of the tags currently in dom_queue
+    if body:
+        _queue_children(dom_queue, queued_tags, body, None, 0)
+
+    while dom_queue:
+        element, element_xpath, parent_xpath, depth = dom_queue.pop()
+
+        if isinstance(element, Tag):
+            queued_tags.discard(id(element))
+            if not _is_element_accepted(element):
+                element.decompose()
+                continue
+
+            # Add children to queue with their path information
+            _queue_children(dom_queue, queued_tags, element, element_xpath, depth)
+
+            # Collect interactive elements with their order
+            if (
+                _is_interactive_element(element) or _is_leaf_element(element)
+            ) and _is_active(element):
+                interactive_elements[element_xpath] = (element, xpath_order_counter, depth)
+                xpath_order_counter += 1
+
+        elif isinstance(element, NavigableString) and element.strip():
+            if element.parent and id(element.parent) not in queued_tags:
+                if parent_xpath:
+                    text_nodes[parent_xpath] = (element, xpath_order_counter, depth - 1)
+                    xpath_order_counter += 1
+
+    return interactive_elements, text_nodes
+
+def _queue_children(
+    dom_queue: list[tuple[PageElement, Optional[str], Optional[str], int]],
+    queued_tags: set[int],
+    parent: Tag,
+    parent_xpath: Optional[str],
+    parent_depth: int,
+) -> None:
+    """Pushes the children of parent in reverse so they pop in document order."""
+    prefix = f'{parent_xpath}/' if parent_xpath else '//'
+    tag_counters: dict[str, int] = {}
+    entries = []
+    for child in parent.children:
+        child_xpath = None
+        if isinstance(child, Tag):
+            sibling_index = tag_counters.get(child.name, 0) + 1
+            tag_counters[child.name] = sibling_index
+            child_xpath = f'{prefix}{child.name}[{sibling_index}]'
+            queued_tags.add(id(child))
+        entries.append((child, child_xpath, parent_xpath, parent_depth + 1))
+    dom_queue.extend(reversed(entries))
 
 async def _batch_check_elements(
-    page:Page, elements: dict[str, tuple[Tag, int]]
+    page:Page,
+    elements: dict[str, tuple[Tag, int, int]],
+    assign_ids: bool = False,
 ) -> BatchCheckResults:
     if not elements:
         return BatchCheckResults(elements={}, texts={})
@@ -142,7 +309,9 @@ async def _batch_check_elements(
         (function() {
             const results = {};
             const elements = %s;
-            
+            const assignIds = %s;
+            const seenIds = new Set();
+%s
             for (const [xpath, elementData] of Object.entries(elements)) {
                 const element = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
                 if (!element) continue;
@@ -177,13 +346,19 @@ async def _batch_check_elements(
                     results[xpath] = {
                         xpath: xpath,
                         isVisible: true,
-                        isTopElement: true
+                        isTopElement: true,
+                        rect: [rect.left, rect.top, rect.width, rect.height],
+                        stableId: assignIds ? stableId(element, seenIds) : null
                     };
                 }
             }
             return results;
         })();
-    """ % json.dumps({xpath: {} for xpath in elements.keys()})
+    """ % (
+        json.dumps({xpath: {} for xpath in elements.keys()}),
+        json.dumps(assign_ids),
+        _STABLE_ID_SCRIPT,
+    )
 
     try:
         await page.wait_for_load_state('load')
@@ -197,7 +372,7 @@ async def _batch_check_elements(
         return BatchCheckResults(elements={}, texts={})
 
 async def _batch_check_texts(
-    page:Page, texts: dict[str, tuple[NavigableString, int]]
+    page:Page, texts: dict[str, tuple[NavigableString, int, int]]
 ) -> BatchCheckResults:
     if not texts:
         return BatchCheckResults(elements={}, texts={})
@@ -264,17 +439,86 @@ def _cap_text_length(text: str, max_length: int = 250) -> str:
         return text[:half_length] + '...' + text[-half_length:]
     return text
 
-def _extract_text_from_all_children(element: Tag) -> str:
-    text_content = ''
-    for child in element.descendants:
-        if isinstance(child, NavigableString):
-            current_child_text = child.strip()
-        else:
-            current_child_text = child.get_text(strip=True)
-
-        text_content += '\n' + current_child_text
+# Capped text is kept as (length, head, tail) where head/tail are the first/last max_length characters,
+# which is all _cap_text_length needs. Joined child texts are kept as (leading empty pieces, capped
+# text between the first and last non-empty piece or None if every piece is empty, trailing empty pieces).
+_CappedText = tuple[int, str, str]
+_JoinedText = tuple[int, Optional[_CappedText], int]
+_MAIN_CONTENT_STRING_TYPES = {NavigableString, CData}
+
+def _capped(text: str, max_length: int) -> _CappedText:
+    return (len(text), text[:max_length], text[-max_length:])
+
+def _concat_capped(left: _CappedText, right: _CappedText, max_length: int) -> _CappedText:
+    left_length, left_head, left_tail = left
+    right_length, right_head, right_tail = right
+    # Once a side is full it is never rebuilt, so long subtrees stop costing anything past the cap
+    head = left_head if len(left_head) >= max_length else (left_head + right_head)[:max_length]
+    tail = right_tail if len(right_tail) >= max_length else (left_tail + right_tail)[-max_length:]
+    return (left_length + right_length, head, tail)
+
+def _join_pieces(left: _JoinedText, right: _JoinedText, max_length: int) -> _JoinedText:
+    """Concatenates two runs of pieces that are joined with newlines."""
+    left_lead, left_core, left_trail = left
+    right_lead, right_core, right_trail = right
+    if left_core is None:
+        return (left_lead + right_lead, right_core, right_trail)
+    if right_core is None:
+        return (left_lead, left_core, left_trail + right_lead)
+    newlines = left_trail + right_lead + 1
+    separator = (newlines, '\n' * min(newlines, max_length), '\n' * min(newlines, max_length))
+    core = _concat_capped(_concat_capped(left_core, separator, max_length), right_core, max_length)
+    return (left_lead, core, right_trail)
+
+def _single_piece(text: str, max_length: int) -> _JoinedText:
+    return (0, _capped(text, max_length), 0) if text else (1, None, 0)
+
+def _aggregate_texts(root: Optional[Tag], targets: set[int], max_length: int = 250) -> dict[int, str]:
+    """
+    Builds the capped text of every tag in targets (by id) in one bottom-up pass over root.
 
-    return _cap_text_length(text_content.strip()) or ''
+    A tag's text is every descendant's text joined with newlines: a string contributes itself,
+    a tag contributes its get_text(strip=True). Each tag's get_text and joined text are built
+    from its children's results, keeping only the head and tail that _cap_text_length can
+    output, so no subtree is walked more than once.
+    """
+    if root is None or not targets:
+        return {}
+    empty_text: _CappedText = (0, '', '')
+    subtree_texts: dict[int, tuple[_CappedText, _JoinedText]] = {}
+    texts: dict[int, str] = {}
+
+    # Reverse pre-order visits every tag after all of its descendants
+    for tag in reversed([root, *root.find_all(True)]):
+        own_text = empty_text
+        joined: _JoinedText = (0, None, 0)
+        for child in tag.children:
+            if isinstance(child, Tag):
+                child_own_text, child_joined = subtree_texts.pop(id(child))
+                own_text = _concat_capped(own_text, child_own_text, max_length)
+                if child.interesting_string_types in (None, _MAIN_CONTENT_STRING_TYPES):
+                    child_piece = child_own_text
+                else:
+                    child_piece = _capped(child.get_text(strip=True), max_length)
+                joined = _join_pieces(joined, (0, child_piece, 0) if child_piece[0] else (1, None, 0), max_length)
+                joined = _join_pieces(joined, child_joined, max_length)
+            elif isinstance(child, NavigableString):
+                stripped = child.strip()
+                if stripped and type(child) in _MAIN_CONTENT_STRING_TYPES:
+                    own_text = _concat_capped(own_text, _capped(stripped, max_length), max_length)
+                joined = _join_pieces(joined, _single_piece(stripped, max_length), max_length)
+        subtree_texts[id(tag)] = (own_text, joined)
+
+        if id(tag) in targets:
+            core = joined[1]
+            if core is None:
+                texts[id(tag)] = ''
+            elif core[0] > max_length:
+                half_length = max_length // 2
+                texts[id(tag)] = core[1][:half_length] + '...' + core[2][-half_length:]
+            else:
+                texts[id(tag)] = core[1]
+    return texts
 
 def _is_interactive_element(element: Tag) -> bool:
     """Check if element is interactive based on tag name and attributes."""
@@ -352,45 +596,38 @@ def _is_element_accepted(element: Tag) -> bool:
 
     return element.name not in leaf_element_deny_list
 
-def _get_essential_attributes(element: Tag) -> str:
+ESSENTIAL_ATTRIBUTES = [
+    'id',
+    'class',
+    'href',
+    'src',
+    'readonly',
+    'disabled',
+    'checked',
+    'selected',
+    'role',
+    'type',  # Important for inputs, buttons
+    'name',  # Important for form elements
+    'value',  # Current value of form elements
+    'placeholder',  # Helpful for understanding input purpose
+    'title',  # Additional descriptive text
+    'alt',  # Alternative text for images
+    'for',  # Important for label associations
+    'autocomplete',  # Form field behavior
+]
+
+def _get_element_attributes(element: Tag) -> list[tuple[str, str]]:
     """
-    Collects essential attributes from an element.
-    Args:
-        element: The BeautifulSoup PageElement
-    Returns:
-        A string of formatted essential attributes
+    Collects the essential attributes of an element, then its aria-* and data-* attributes.
+    Values are returned in full; _format_attributes caps them.
     """
-    essential_attributes = [
-        'id',
-        'class',
-        'href',
-        'src',
-        'readonly',
-        'disabled',
-        'checked',
-        'selected',
-        'role',
-        'type',  # Important for inputs, buttons
-        'name',  # Important for form elements
-        'value',  # Current value of form elements
-        'placeholder',  # Helpful for understanding input purpose
-        'title',  # Additional descriptive text
-        'alt',  # Alternative text for images
-        'for',  # Important for label associations
-        'autocomplete',  # Form field behavior
-    ]
-
-    # Collect essential attributes that have values
     attrs = []
-    for attr in essential_attributes:
+    for attr in ESSENTIAL_ATTRIBUTES:
         if attr in element.attrs:
             element_attr = element[attr]
-            if isinstance(element_attr, str):
-                element_attr = element_attr
-            elif isinstance(element_attr, (list, tuple)):
+            if isinstance(element_attr, (list, tuple)):
                 element_attr = ' '.join(str(v) for v in element_attr)
-
-            attrs.append(f'{attr}="{_cap_text_length(element_attr, 25)}"')
+            attrs.append((attr, element_attr))
 
     state_attributes_prefixes = (
         'aria-',
@@ -399,10 +636,16 @@ def _get_essential_attributes(element: Tag) -> str:
 
     # Collect data- attributes
     for attr in element.attrs:
-        if attr.startswith(state_attributes_prefixes):
-            attrs.append(f'{attr}="{element[attr]}"')
-
-    return ' '.join(attrs)
+        if attr.startswith(state_attributes_prefixes) and attr != STABLE_ID_ATTRIBUTE:
+            attrs.append((attr, element[attr]))
+    return attrs
+
+def _format_attributes(attributes: list[tuple[str, str]]) -> str:
+    """Formats attributes as in the element strings: essential ones capped, aria-* and data-* in full."""
+    return ' '.join(
+        f'{name}="{_cap_text_length(value, 25) if name in ESSENTIAL_ATTRIBUTES else value}"'
+        for name, value in attributes
+    )
 
 def _is_active(element: Tag) -> bool:
     """Check if element is active (not disabled)."""
@@ -412,13 +655,246 @@ def _is_active(element: Tag) -> bool:
         or element.get('aria-disabled') == 'true'
     )
 
-def dom_to_string(dom_elements: list[DomContentItem] ) -> str:
-		"""Convert the processed DOM content to HTML."""
-		string = ''
+def carry_over_indices(
+    previous: DOM, current: DOM, next_index: int, stable_ids: bool = False
+) -> tuple[DOM, DomDiff, int]:
+    """
+    Re-indexes a fresh extraction of the same page against the previous one. Interactive elements
+    that are still there keep their previous index, new ones get indices from next_index onwards,
+    so indices the LLM has already seen stay valid. Returns the re-indexed DOM, the diff between the
+    two extractions and the next free index.
+    Elements are matched by aligning the two element sequences on their text (tag, attributes and
+    inner text), so an element inserted or removed above others does not shift their indices the
+    way their xpaths shift; elements left over are matched by text alone, in order.
+    With stable_ids the indices already come from the page: elements are matched by index and text
+    and nothing is re-indexed, only the diff is computed.
+    """
+    previous_items = [item for item in previous.elements if not item.is_text_only and item.index in previous.element_map]
+    current_items = [item for item in current.elements if not item.is_text_only]
+    # Position in current_items -> index in the previous DOM
+    matches = _match_stable_ids(previous_items, current_items) if stable_ids else _match_elements(previous_items, current_items)
+    previous_texts = Counter((item.depth, item.text) for item in previous.elements if item.is_text_only)
+
+    elements: list[DomContentItem] = []
+    element_map: dict[int, str] = {}
+    element_rects: dict[int, list[float]] = {}
+    added: list[DomContentItem] = []
+    current_texts: Counter = Counter()
+    position = 0
+    for item in current.elements:
+        if item.is_text_only:
+            elements.append(item)
+            key = (item.depth, item.text)
+            current_texts[key] += 1
+            if current_texts[key] > previous_texts[key]:
+                added.append(item)
+            continue
+        xpath = current.element_map[item.index]
+        rect = current.element_rects.get(item.index)
+        if position in matches:
+            item = replace(item, index=matches[position])
+        else:
+            if not stable_ids:
+                item = replace(item, index=next_index)
+                next_index += 1
+            added.append(item)
+        position += 1
+        elements.append(item)
+        element_map[item.index] = xpath
+        if rect:
+            element_rects[item.index] = rect
+
+    kept_indices = set(matches.values())
+    removed: list[DomContentItem] = []
+    for item in previous.elements:
+        if item.is_text_only:
+            key = (item.depth, item.text)
+            if current_texts[key] > 0:
+                current_texts[key] -= 1
+            else:
+                removed.append(item)
+        elif item.index not in kept_indices:
+            removed.append(item)
+
+    diff = DomDiff.model_construct(added=added, removed=removed, unchanged=len(kept_indices))
+    dom = DOM.model_construct(elements=elements, element_map=element_map, element_rects=element_rects)
+    return dom, diff, next_index
+
+def _match_stable_ids(previous_items: list[DomContentItem], current_items: list[DomContentItem]) -> dict[int, int]:
+    previous_keys = {(item.index, item.text) for item in previous_items}
+    return {
+        position: item.index
+        for position, item in enumerate(current_items)
+        if (item.index, item.text) in previous_keys
+    }
+
+def _match_elements(previous_items: list[DomContentItem], current_items: list[DomContentItem]) -> dict[int, int]:
+    previous_texts = [item.text for item in previous_items]
+    current_texts = [item.text for item in current_items]
+    matches = {
+        current_position: previous_items[previous_position].index
+        for previous_position, current_position in _align(previous_texts, current_texts)
+    }
+    # Elements that moved past others, e.g. in a list that was reordered
+    matched_indices = set(matches.values())
+    unmatched_previous: dict[str, list[int]] = {}
+    for item in previous_items:
+        if item.index not in matched_indices:
+            unmatched_previous.setdefault(item.text, []).append(item.index)
+    for position, item in enumerate(current_items):
+        if position not in matches and unmatched_previous.get(item.text):
+            matches[position] = unmatched_previous[item.text].pop(0)
+    return matches
+
+def _align(a: list[str], b: list[str]) -> list[tuple[int, int]]:
+    """
+    Pairs of positions of equal items of a and b, in order on both sides (patience diff): common
+    prefixes and suffixes are paired, then the longest run of items that occur once in both is
+    used to split the rest into smaller ranges. Linear-ish where a general LCS is quadratic on the
+    repeated texts (buttons, list items) pages are full of.
+    """
+    pairs: list[tuple[int, int]] = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        a_start, a_end, b_start, b_end = ranges.pop()
+        while a_start < a_end and b_start < b_end and a[a_start] == b[b_start]:
+            pairs.append((a_start, b_start))
+            a_start += 1
+            b_start += 1
+        while a_start < a_end and b_start < b_end and a[a_end - 1] == b[b_end - 1]:
+            a_end -= 1
+            b_end -= 1
+            pairs.append((a_end, b_end))
+        if a_start == a_end or b_start == b_end:
+            continue
+
+        a_counts = Counter(a[a_start:a_end])
+        b_positions: dict[str, int] = {}
+        b_counts = Counter(b[b_start:b_end])
+        for position in range(b_start, b_end):
+            if b_counts[b[position]] == 1 and a_counts[b[position]] == 1:
+                b_positions[b[position]] = position
+        anchors = [(position, b_positions[a[position]]) for position in range(a_start, a_end) if a[position] in b_positions]
+        anchors = _longest_increasing(anchors)
+        if not anchors:
+            continue
+        pairs.extend(anchors)
+        bounds = [(a_start - 1, b_start - 1), *anchors, (a_end, b_end)]
+        for (a_low, b_low), (a_high, b_high) in zip(bounds, bounds[1:]):
+            if a_high - a_low > 1 and b_high - b_low > 1:
+                ranges.append((a_low + 1, a_high, b_low + 1, b_high))
+    return pairs
+
+def _longest_increasing(anchors: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Longest subsequence of anchors (increasing in the first item) that also increases in the second."""
+    tails: list[int] = []         # tails[k]: anchor ending the best run of length k + 1 found so far
+    tail_values: list[int] = []   # its second item
+    previous: list[int] = []
+    for position, (_, value) in enumerate(anchors):
+        length = bisect_left(tail_values, value)
+        previous.append(tails[length - 1] if length else -1)
+        if length == len(tails):
+            tails.append(position)
+            tail_values.append(value)
+        else:
+            tails[length] = position
+            tail_values[length] = value
+    run: list[tuple[int, int]] = []
+    position = tails[-1] if tails else -1
+    while position >= 0:
+        run.append(anchors[position])
+        position = previous[position]
+    return run[::-1]
+
+# Attributes kept by the compact serialization; everything else (src, autocomplete, data-*, ...) is dropped
+COMPACT_ATTRIBUTES = {
+    'id', 'class', 'href', 'role', 'type', 'name', 'value', 'placeholder', 'title', 'alt', 'for',
+    'readonly', 'disabled', 'checked', 'selected',
+    'aria-label', 'aria-expanded', 'aria-checked', 'aria-selected', 'aria-pressed', 'aria-current', 'aria-haspopup',
+}
+COMPACT_ATTRIBUTE_LENGTH = 40
+
+def dom_diff_to_string(diff: DomDiff, compact: bool = False) -> str:
+    """
+    Convert a DomDiff to the same line format as dom_to_string. In compact form classes are written
+    out in full: the two sections are serialized separately, and class#N aliases of one section or
+    of an earlier observation must not be read as those of another.
+    """
+    if not diff.added and not diff.removed:
+        return f'No changes. All {diff.unchanged} interactive elements are unchanged.\n'
+    def serialize(items: list[DomContentItem]) -> str:
+        return _dom_to_compact_string(items, alias_classes=False) if compact else dom_to_string(items)
+    parts = [f'Unchanged interactive elements: {diff.unchanged} (their indexes are still valid)\n']
+    if diff.added:
+        parts.append(f'Added:\n{serialize(diff.added)}')
+    if diff.removed:
+        parts.append(f'Removed (do not use these indexes):\n{serialize(diff.removed)}')
+    return ''.join(parts)
+
+def dom_to_string(dom_elements: list[DomContentItem], compact: bool = False) -> str:
+		"""
+		Convert the processed DOM content to HTML.
+		compact uses fewer tokens: see _dom_to_compact_string.
+		"""
+		if compact:
+			return _dom_to_compact_string(dom_elements)
+		lines = []
 		for element in dom_elements:
 			element_depth = '\t' * element.depth * 1
 			if element.is_text_only:
-				string += f'_[:]{element_depth}{element.text}\n'
+				lines.append(f'_[:]{element_depth}{element.text}\n')
 			else:
-				string += f'{element.index}[:]{element_depth}{element.text}\n'
-		return string
\ No newline at end of file
+				lines.append(f'{element.index}[:]{element_depth}{element.text}\n')
+		return ''.join(lines)
+
+def _dom_to_compact_string(dom_elements: list[DomContentItem], alias_classes: bool = True) -> str:
+    """
+    Same line format as dom_to_string, with fewer tokens:
+    - indentation levels are the distinct depths on the page, so the shared ancestors of every
+      element no longer cost a tab each
+    - only COMPACT_ATTRIBUTES are kept, each capped at COMPACT_ATTRIBUTE_LENGTH characters
+    - class names are de-duplicated, and with alias_classes a class string used by several elements
+      is written in full once as class#N="..." and then referred to as class#N within this listing
+    """
+    levels = {depth: level for level, depth in enumerate(sorted({element.depth for element in dom_elements}))}
+    class_counts = Counter(
+        _dedupe_classes(value)
+        for element in dom_elements
+        if element.attributes
+        for name, value in element.attributes
+        if name == 'class'
+    )
+    class_aliases: dict[str, int] = {}
+    lines = []
+    for element in dom_elements:
+        indent = '\t' * levels[element.depth]
+        if element.is_text_only:
+            lines.append(f'_[:]{indent}{element.text}\n')
+            continue
+        if element.tag is None:
+            lines.append(f'{element.index}[:]{indent}{element.text}\n')
+            continue
+        attrs = []
+        for name, value in element.attributes or []:
+            if name not in COMPACT_ATTRIBUTES:
+                continue
+            if name == 'class':
+                value = _dedupe_classes(value)
+                if alias_classes and class_counts[value] > 1:
+                    if value in class_aliases:
+                        attrs.append(f'class#{class_aliases[value]}')
+                        continue
+                    class_aliases[value] = len(class_aliases) + 1
+                    name = f'class#{class_aliases[value]}'
+            attrs.append(f'{name}="{_cap_text_length(value, COMPACT_ATTRIBUTE_LENGTH)}"')
+        attributes = ' '.join(attrs)
+        lines.append(
+            f"{element.index}[:]{indent}<{element.tag}{' ' + attributes if attributes else ''}>"
+            f"{element.inner_text}</{element.tag}>\n"
+        )
+    if class_aliases:
+        lines.insert(0, '[In this listing, class#N stands for the class written out at its first class#N="..."]\n')
+    return ''.join(lines)
+
+def _dedupe_classes(value: str) -> str:
+    return ' '.join(dict.fromkeys(value.split()))
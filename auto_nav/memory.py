@@ -0,0 +1,139 @@
+from typing import Callable, List, Optional, Union
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+# Rough per-image cost used by the default token estimate
+IMAGE_TOKEN_ESTIMATE = 1000
+# Characters per token used by the default token estimate
+CHARS_PER_TOKEN = 4
+
+SUMMARY_HEADER = '[Summary of earlier steps]'
+
+HistoryItem = Union[str, BaseMessage]
+
+
+def estimate_tokens(messages: List[HistoryItem]) -> int:
+    """Approximate token count of a message history: ~4 characters per token plus a fixed cost per image."""
+    characters = 0
+    images = 0
+    for message in messages:
+        content = message if isinstance(message, str) else message.content
+        if isinstance(content, str):
+            characters += len(content)
+        else:
+            for part in content:
+                if isinstance(part, dict) and part.get('type') == 'image_url':
+                    images += 1
+                elif isinstance(part, dict):
+                    characters += len(part.get('text', ''))
+                else:
+                    characters += len(str(part))
+        if isinstance(message, AIMessage):
+            characters += sum(len(str(tool_call.get('args', {}))) for tool_call in message.tool_calls)
+    return characters // CHARS_PER_TOKEN + images * IMAGE_TOKEN_ESTIMATE
+
+
+class ConversationMemory:
+    """
+    Keeps the agent's message history within a token budget.
+
+    The history is the system prompt and task followed by turns: an LLM response, the results of
+    its tool calls and, with change-only observations, the observation text kept before it. When
+    the history goes over token_budget, every turn but the last keep_last_turns is collapsed into
+    one rolling summary of the actions taken and their results. Token counts of every prompt sent
+    to the LLM are kept in step_tokens.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        keep_last_turns: int = 3,
+        token_counter: Optional[Callable[[List[HistoryItem]], int]] = None,
+        max_result_chars: int = 150,
+    ):
+        self.token_budget = token_budget
+        self.keep_last_turns = keep_last_turns
+        self.token_counter = token_counter or estimate_tokens
+        self.max_result_chars = max_result_chars
+        self.step_tokens: List[int] = []
+        self.compactions = 0
+
+    def record_step(self, messages: List[HistoryItem]) -> int:
+        """Counts the tokens of the prompt about to be sent to the LLM."""
+        tokens = self.token_counter(messages)
+        self.step_tokens.append(tokens)
+        return tokens
+
+    def compact(self, message_history: List[HistoryItem], preserved: int = 2) -> bool:
+        """
+        Collapses old turns in place when the history is over budget. The first `preserved` items
+        (system prompt and task) are never touched. Returns whether the history was compacted: the
+        observation texts of the collapsed turns are gone, so the next observation must not be a
+        diff against them.
+        """
+        if self.token_budget is None or self.token_counter(message_history) <= self.token_budget:
+            return False
+
+        head = message_history[:preserved]
+        rest = message_history[preserved:]
+        summary_lines: List[str] = []
+        if rest and self._is_summary(rest[0]):
+            summary_lines = rest[0].content.split('\n')[1:]
+            rest = rest[1:]
+
+        turns = self._split_turns(rest)
+        if len(turns) <= self.keep_last_turns:
+            return False
+        old_turns = turns[:len(turns) - self.keep_last_turns] if self.keep_last_turns else turns
+        recent_turns = turns[len(old_turns):]
+        for turn in old_turns:
+            summary_lines.extend(self._summarize_turn(turn))
+
+        recent = [message for turn in recent_turns for message in turn]
+        summary = HumanMessage(content='\n'.join([SUMMARY_HEADER, *summary_lines]))
+        # Drop the oldest summary lines if the summary alone would still break the budget
+        while len(summary_lines) > 1 and self.token_counter(head + [summary] + recent) > self.token_budget:
+            summary_lines = summary_lines[len(summary_lines) // 4 or 1:]
+            summary = HumanMessage(content='\n'.join([SUMMARY_HEADER, '...', *summary_lines]))
+
+        message_history[:] = head + [summary] + recent
+        self.compactions += 1
+        return True
+
+    def _split_turns(self, messages: List[HistoryItem]) -> List[List[HistoryItem]]:
+        """Groups messages so that each turn ends with the tool results of one LLM response."""
+        turns: List[List[HistoryItem]] = []
+        current: List[HistoryItem] = []
+        for message in messages:
+            # A new turn starts at a response or at an observation that follows tool results
+            if current and isinstance(message, (AIMessage, HumanMessage)) and not isinstance(current[-1], HumanMessage):
+                turns.append(current)
+                current = []
+            current.append(message)
+        if current:
+            turns.append(current)
+        return turns
+
+    def _summarize_turn(self, turn: List[HistoryItem]) -> List[str]:
+        lines: List[str] = []
+        results = {message.tool_call_id: message.content for message in turn if isinstance(message, ToolMessage)}
+        for message in turn:
+            if not isinstance(message, AIMessage):
+                continue
+            if isinstance(message.content, str) and message.content.strip():
+                lines.append(f'- Thought: {self._shorten(message.content)}')
+            for tool_call in message.tool_calls:
+                result = results.get(tool_call.get('id'), 'no result')
+                lines.append(
+                    f"- {tool_call.get('name')}({tool_call.get('args', {})}) -> {self._shorten(str(result))}"
+                )
+        return lines
+
+    def _shorten(self, text: str) -> str:
+        text = ' '.join(text.split())
+        if len(text) > self.max_result_chars:
+            return text[:self.max_result_chars] + '...'
+        return text
+
+    @staticmethod
+    def _is_summary(message: HistoryItem) -> bool:
+        return isinstance(message, HumanMessage) and isinstance(message.content, str) and message.content.startswith(SUMMARY_HEADER)
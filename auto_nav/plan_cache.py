@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+from pydantic import BaseModel
+from auto_nav.dom_utils import DOM
+
+logger = logging.getLogger(__name__)
+
+# Attributes that identify an element across page loads. 'value' and 'class' change with state, so they are left out.
+STABLE_ATTRIBUTES = ('id', 'name', 'type', 'placeholder', 'aria-label', 'role', 'href', 'title', 'alt', 'for')
+
+# Matches the element strings built by get_elements: <tag attr="value" ...>text</tag>
+ELEMENT_PATTERN = re.compile(r'^<([\w-]+)((?:\s+[^\s=]+="[^"]*")*)>(.*)</\1>$', re.DOTALL)
+ATTRIBUTE_PATTERN = re.compile(r'([^\s=]+)="([^"]*)"')
+
+class ElementFingerprint(BaseModel):
+    tag: str
+    attributes: dict[str, str]
+    text: str
+
+class PlanStep(BaseModel):
+    tool: str
+    args: dict[str, Any]
+    element: Optional[ElementFingerprint] = None    # the element the 'index' argument pointed to
+
+class Plan(BaseModel):
+    task: str
+    start_url: str
+    steps: list[PlanStep]
+    result: str
+    created_at: float
+
+class PlanCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    divergences: int = 0
+    completed_replays: int = 0
+    replayed_steps: int = 0
+    stores: int = 0
+
+def normalize_task(task: str) -> str:
+    return ' '.join(task.lower().split())
+
+def fingerprint_element(element_text: str) -> Optional[ElementFingerprint]:
+    """Parses an element string of the DOM into its tag, stable attributes and text."""
+    match = ELEMENT_PATTERN.match(element_text.strip())
+    if not match:
+        return None
+    tag, attributes, text = match.groups()
+    stable = {name: value for name, value in ATTRIBUTE_PATTERN.findall(attributes) if name in STABLE_ATTRIBUTES}
+    return ElementFingerprint(tag=tag, attributes=stable, text=' '.join(text.split()))
+
+def find_element(dom: DOM, fingerprint: ElementFingerprint, original_index: Optional[int] = None) -> Optional[int]:
+    """
+    Returns the index of the element of dom that matches the fingerprint, or None.
+    The tag and the text must be the same and at least half of the recorded stable attributes must
+    match. The element with the most matching attributes wins; ties go to the index closest to the
+    recorded one.
+    """
+    best: Optional[tuple[int, int, int]] = None     # (score, -distance, index)
+    for item in dom.elements:
+        if item.is_text_only:
+            continue
+        candidate = fingerprint_element(item.text)
+        if candidate is None or candidate.tag != fingerprint.tag or candidate.text != fingerprint.text:
+            continue
+        matching = sum(candidate.attributes.get(name) == value for name, value in fingerprint.attributes.items())
+        if matching * 2 < len(fingerprint.attributes) or not (matching or fingerprint.text):
+            continue
+        distance = abs(item.index - original_index) if original_index is not None else 0
+        key = (matching, -distance, item.index)
+        if best is None or key > best:
+            best = key
+    return best[2] if best else None
+
+class PlanCache:
+    """
+    Persistent cache of the tool-call sequences that completed a task, keyed by the normalized task
+    and the url the browser started on. One JSON file per key, written atomically so several
+    processes can share the directory. Only the latest successful plan of a key is kept.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stats = PlanCacheStats()
+
+    def _path(self, task: str, start_url: str) -> Path:
+        digest = hashlib.sha256(f'{normalize_task(task)}\n{start_url}'.encode()).hexdigest()
+        return self.directory / f'{digest}.json'
+
+    def lookup(self, task: str, start_url: str) -> Optional[Plan]:
+        try:
+            plan = Plan.model_validate_json(self._path(task, start_url).read_text())
+        except (OSError, ValueError):
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return plan
+
+    def store(self, task: str, start_url: str, steps: list[PlanStep], result: str) -> None:
+        plan = Plan(task=task, start_url=start_url, steps=steps, result=result, created_at=time.time())
+        path = self._path(task, start_url)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                file.write(plan.model_dump_json())
+            os.replace(temp_path, path)
+            self.stats.stores += 1
+        except OSError as e:
+            logger.warning(f"Could not store plan {path.name}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def invalidate(self, task: str, start_url: str) -> None:
+        try:
+            self._path(task, start_url).unlink()
+        except OSError:
+            pass
+
+    @staticmethod
+    def make_step(tool_call: dict, dom: Optional[DOM]) -> PlanStep:
+        """Records a tool call, with the fingerprint of the element its index pointed to in dom."""
+        args = dict(tool_call.get('args', {}))
+        element = None
+        if 'index' in args and dom is not None:
+            item = next((item for item in dom.elements if not item.is_text_only and item.index == args['index']), None)
+            if item is not None:
+                element = fingerprint_element(item.text)
+        return PlanStep(tool=tool_call.get('name'), args=args, element=element)
+
+    def summary(self) -> dict:
+        return self.stats.model_dump()
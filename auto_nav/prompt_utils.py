@@ -1,5 +1,9 @@
 from __future__ import annotations
-from auto_nav.browser import Browser
+import asyncio
+import time
+from auto_nav.browser import Browser, ObservationMetric
+from auto_nav.dom_utils import dom_diff_to_string
+from auto_nav.tracing import trace_span
 import importlib.resources
 from langchain_core.messages import (
     HumanMessage,
@@ -11,32 +15,91 @@ async def create_observation_message(
     browser: Browser, 
     step_number: int,
     max_steps: int,
+    changes_only: bool = False,
     ) -> HumanMessage:
+    """
+    Builds the observation for the current step. With changes_only, and when the browser could
+    diff the page against the previous step, only the changed elements are listed.
+    """
+    with trace_span(browser.tracer, 'observation'):
+        message = await _build_observation_message(browser, step_number, max_steps, changes_only)
+    if browser.tracer:
+        browser.tracer.count('observation.text_bytes', len(message.content[0]['text']))
+    return message
 
-    url = await browser.get_current_url()
-    elements = await browser.update_dom()
-    elements_text = f'[Start of page]\n{elements}\n[End of page]'
+async def _build_observation_message(browser: Browser, step_number: int, max_steps: int, changes_only: bool) -> HumanMessage:
+    start_time = time.perf_counter()
+    speculative_hits = browser.speculative_hits
+    # The DOM and the raw screenshot are independent, only the labels drawn on the screenshot need the DOM
+    ((url, title, scroll_text), page_info_ms), (elements, dom_ms), (raw_screenshot, capture_ms) = await asyncio.gather(
+        _timed(_page_info(browser)),
+        _timed(browser.update_dom()),
+        _timed(browser.capture_screenshot()),
+    )
+    screenshot, render_ms = await _timed(asyncio.to_thread(browser.render_screenshot, raw_screenshot))
+    stage_ms = [page_info_ms, dom_ms, capture_ms, render_ms]
+    browser.observation_metrics.append(ObservationMetric(
+        page_info_ms=page_info_ms,
+        dom_ms=dom_ms,
+        screenshot_capture_ms=capture_ms,
+        screenshot_render_ms=render_ms,
+        total_ms=(time.perf_counter() - start_time) * 1000,
+        serial_ms=sum(stage_ms),
+        speculative_dom_hit=browser.speculative_hits > speculative_hits,
+    ))
+    if changes_only and browser.dom_diff is not None:
+        elements_text = (
+            '[Changes since the previous step; elements not listed are unchanged and keep their indexes]\n'
+            f'{dom_diff_to_string(browser.dom_diff, browser.compact_dom)}'
+        )
+    else:
+        elements_text = f'[Start of page]\n{elements}\n[End of page]'
     step_info_description = f'Current step: {step_number}/{max_steps}'
+    if screenshot is not None:
+        image_description = 'An image is provided, use it to understand the context, the bounding boxes around the buttons have the same indexes as the interactive elements.'
+    else:
+        image_description = 'No new image is provided, the page looks the same as in the last image provided.'
     state_description = f"""
 [Task history memory ends]
 [Current state starts here]
 The following is one-time information - if you need to remember it mention it in your response (as instructed in the beginning)
-An image is provided, use it to understand the context, the bounding boxes around the buttons have the same indexes as the interactive elements.
+{image_description}
 Current url: {url}
+Page title: {title}
+{scroll_text}
 Interactive elements of the page:
 {elements_text}
 {step_info_description}
 """
-    screenshot = await browser.take_screenshot()
-    return HumanMessage(
-				content=[
-					{'type': 'text', 'text': state_description},
-					{
-						'type': 'image_url',
-						'image_url': {'url': f'data:image/png;base64,{screenshot}'},
-					},
-				]
-			)
+    content = [{'type': 'text', 'text': state_description}]
+    if screenshot is not None:
+        content.append(
+            {
+                'type': 'image_url',
+                'image_url': {'url': f'data:{browser.screenshot_config.media_type};base64,{screenshot}'},
+            }
+        )
+    return HumanMessage(content=content)
+
+async def _page_info(browser: Browser) -> tuple[str, str, str]:
+    url = await browser.get_current_url()
+    try:
+        title = await browser.get_title()
+        scroll = await browser.get_scroll_info()
+        scroll_text = (
+            f"Scroll position: {scroll['scroll_y']}px of {scroll['page_height']}px, "
+            f"{scroll['pixels_below']}px below the viewport"
+        )
+    except Exception:
+        # A navigation in progress can make these unavailable, the observation is still useful without them
+        title, scroll_text = '', ''
+    return url, title, scroll_text
+
+async def _timed(awaitable):
+    """Awaits and returns the result with the elapsed milliseconds."""
+    start_time = time.perf_counter()
+    result = await awaitable
+    return result, (time.perf_counter() - start_time) * 1000
 
 def load_prompt() -> str:
     """Load the prompt template from the markdown file."""
@@ -0,0 +1,285 @@
+import asyncio
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+from pydantic import BaseModel
+from playwright.async_api import Request, Route
+
+logger = logging.getLogger(__name__)
+
+# Heuristic freshness for responses with Last-Modified but no explicit lifetime (RFC 9111 4.2.2)
+HEURISTIC_FRACTION = 0.1
+MAX_HEURISTIC_FRESHNESS_S = 24 * 3600
+
+# Response headers that describe the bytes on the wire; the cached body is already decoded
+HOP_BY_HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+# Streamed resources: route.fetch would buffer them whole in memory, and they are requested in ranges
+UNCACHED_RESOURCE_TYPES = {'media'}
+
+ENTRY_SUFFIX = '.entry'
+VARY_SUFFIX = '.vary'
+TEMP_SUFFIX = '.tmp'
+# Temporary files older than this were left behind by a crashed writer
+STALE_TEMP_S = 3600
+
+class CacheStats(BaseModel):
+    lookups: int = 0
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_served: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+def freshness_lifetime(headers: dict[str, str], now: float) -> float:
+    """
+    Seconds a response may still be served from the cache, 0 when it must not be cached.
+    Follows Cache-Control (no-store, no-cache, private, s-maxage, max-age), then Expires, then the
+    Last-Modified heuristic. The age the response already has, from its Age header or its Date,
+    is subtracted (RFC 9111 4.2.3).
+    """
+    date = _parse_http_date(headers.get('date')) or now
+    try:
+        age = max(float(headers.get('age', 0)), now - date, 0.0)
+    except ValueError:
+        age = max(now - date, 0.0)
+    return max(_freshness_lifetime(headers, date) - age, 0.0)
+
+def _freshness_lifetime(headers: dict[str, str], date: float) -> float:
+    """The response's whole freshness lifetime, counted from its Date."""
+    directives = {}
+    for part in headers.get('cache-control', '').lower().split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name] = value.strip('"')
+    if {'no-store', 'no-cache', 'private'} & directives.keys():
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(float(directives[name]), 0.0)
+            except ValueError:
+                return 0.0
+
+    if 'expires' in headers:
+        expires = _parse_http_date(headers['expires'])
+        return max(expires - date, 0.0) if expires else 0.0
+    last_modified = _parse_http_date(headers.get('last-modified'))
+    if last_modified:
+        return min(max(date - last_modified, 0.0) * HEURISTIC_FRACTION, MAX_HEURISTIC_FRESHNESS_S)
+    return 0.0
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class ResponseCache:
+    """
+    Shared HTTP cache on disk, served through Playwright routing (see RequestRouter.handlers).
+
+    Entries are keyed by url plus the request values of the headers named in the response's Vary.
+    Only GET 200 responses that Cache-Control allows are stored, and never ones that set cookies or
+    answer a request with credentials (an Authorization or Cookie header). Media and bodies over
+    max_entry_mb are not cached. The least recently used files are evicted to stay under
+    max_size_mb. Every write goes to a temporary file that is then renamed into place, so several
+    Browser instances and processes can share one directory.
+    Stats are kept per instance: pass the same instance to every Browser of a process.
+    """
+
+    def __init__(self, directory: str, max_size_mb: float = 512, max_entry_mb: float = 16, rescan_every: int = 100):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_entry_bytes = int(max_entry_mb * 1024 * 1024)
+        # Other processes write to the same directory, so the size estimate is refreshed from disk now and then
+        self.rescan_every = rescan_every
+        self.stats = CacheStats()
+        self._writes_since_scan = 0
+        self._size_estimate = self._disk_usage()
+        self._evict_lock = asyncio.Lock()
+
+    async def handle(self, route: Route, request: Request) -> bool:
+        """Route handler: fulfills the request from the cache or the network. Returns False to let it pass through."""
+        if request.method != 'GET' or request.resource_type in UNCACHED_RESOURCE_TYPES:
+            return False
+        # request.headers leaves out Cookie and other headers the network stack adds
+        request_headers = await request.all_headers()
+        if {'authorization', 'cookie', 'range'} & request_headers.keys():
+            return False
+        url = request.url
+        self.stats.lookups += 1
+        entry = await asyncio.to_thread(self._load, url, request_headers)
+        if entry is not None:
+            meta, body = entry
+            self.stats.hits += 1
+            self.stats.bytes_served += len(body)
+            await route.fulfill(status=meta['status'], headers=meta['headers'], body=body)
+            return True
+
+        self.stats.misses += 1
+        # Redirects go back to the browser, so the page ends up on the target url and the target is
+        # cached under its own url. 3xx responses themselves are never stored.
+        response = await route.fetch(max_redirects=0)
+        body = await response.body()
+        await route.fulfill(response=response)
+        headers = response.headers
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if (
+            response.status == 200
+            and lifetime > 0
+            and len(body) <= self.max_entry_bytes
+            and 'set-cookie' not in headers
+            and headers.get('vary') != '*'
+        ):
+            await asyncio.to_thread(self._store, url, request_headers, headers, body, now + lifetime)
+            self.stats.stores += 1
+            await self._evict_if_needed()
+        return True
+
+    def _vary_names(self, url: str) -> Optional[list[str]]:
+        try:
+            return json.loads((self.directory / (_digest(url) + VARY_SUFFIX)).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _entry_path(self, url: str, vary_names: list[str], request_headers: dict[str, str]) -> Path:
+        variant = '\n'.join(f'{name}:{request_headers.get(name, "")}' for name in vary_names)
+        return self.directory / (_digest(f'{url}\n{variant}') + ENTRY_SUFFIX)
+
+    def _load(self, url: str, request_headers: dict[str, str]) -> Optional[tuple[dict, bytes]]:
+        vary_names = self._vary_names(url)
+        if vary_names is None:
+            return None
+        path = self._entry_path(url, vary_names, request_headers)
+        try:
+            with open(path, 'rb') as file:
+                meta_length = int.from_bytes(file.read(4), 'big')
+                meta = json.loads(file.read(meta_length))
+                body = file.read()
+        except (OSError, ValueError):
+            return None
+        if meta['expires_at'] <= time.time():
+            return None
+        try:
+            # The access time drives LRU eviction; the Vary file is needed to find the entry
+            os.utime(path)
+            os.utime(self.directory / (_digest(url) + VARY_SUFFIX))
+        except OSError:
+            pass
+        return meta, body
+
+    def _store(self, url: str, request_headers: dict[str, str], headers: dict[str, str], body: bytes, expires_at: float) -> None:
+        vary_names = sorted({name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()})
+        meta = json.dumps({
+            'url': url,
+            'status': 200,
+            'headers': {name: value for name, value in headers.items() if name not in HOP_BY_HOP_HEADERS},
+            'expires_at': expires_at,
+        }).encode()
+        path = self._entry_path(url, vary_names, request_headers)
+        self._atomic_write(path, len(meta).to_bytes(4, 'big') + meta + body)
+        vary = json.dumps(vary_names).encode()
+        self._atomic_write(self.directory / (_digest(url) + VARY_SUFFIX), vary)
+        self._size_estimate += len(body) + len(meta) + 4 + len(vary)
+        self._writes_since_scan += 1
+
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=TEMP_SUFFIX)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path.name}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    async def _evict_if_needed(self) -> None:
+        if self._size_estimate <= self.max_size_bytes and self._writes_since_scan < self.rescan_every:
+            return
+        async with self._evict_lock:
+            self.stats.evictions += await asyncio.to_thread(self._evict)
+
+    def _evict(self) -> int:
+        """
+        Deletes the least recently used files until the cache fits max_size_bytes. Entries and Vary
+        files count alike: an entry whose Vary file is gone is never hit again and ages out.
+        Temporary files left behind by crashed writers are deleted first.
+        """
+        files = []
+        now = time.time()
+        for mtime, size, path in self._files():
+            if path.suffix == TEMP_SUFFIX:
+                if now - mtime > STALE_TEMP_S:
+                    _unlink(path)
+                    continue
+                # Still being written by another process
+                files.append((now, size, path))
+            else:
+                files.append((mtime, size, path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_size_bytes:
+                break
+            if path.suffix == ENTRY_SUFFIX and _unlink(path):
+                evicted += 1
+            elif path.suffix == VARY_SUFFIX:
+                _unlink(path)
+            else:
+                continue
+            total -= size
+        self._size_estimate = total
+        self._writes_since_scan = 0
+        return evicted
+
+    def _files(self) -> list[tuple[float, int, Path]]:
+        """(mtime, size, path) of every file of the cache."""
+        files = []
+        for path in self.directory.iterdir():
+            if path.suffix not in (ENTRY_SUFFIX, VARY_SUFFIX, TEMP_SUFFIX):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def summary(self) -> dict:
+        return {
+            **self.stats.model_dump(),
+            'hit_rate': round(self.stats.hit_rate, 3),
+            'size_bytes': self._size_estimate,
+        }
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except OSError:
+        # Already evicted by another process
+        return False
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
@@ -0,0 +1,157 @@
+import fnmatch
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, List, Optional, Set
+from urllib.parse import urlsplit
+from pydantic import BaseModel
+from playwright.async_api import BrowserContext, Request, Route
+
+logger = logging.getLogger(__name__)
+
+# Rough typical transfer sizes, used to estimate the bytes a blocked request would have cost
+ESTIMATED_BYTES_BY_TYPE = {
+    'image': 30_000,
+    'media': 250_000,
+    'font': 30_000,
+    'script': 20_000,
+    'stylesheet': 10_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+TRACKER_DOMAINS = {
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'adservice.google.com',
+    'amazon-adsystem.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'hotjar.com',
+    'segment.io',
+    'segment.com',
+    'mixpanel.com',
+    'scorecardresearch.com',
+    'criteo.com',
+    'criteo.net',
+    'taboola.com',
+    'outbrain.com',
+    'quantserve.com',
+    'adnxs.com',
+    'bat.bing.com',
+    'clarity.ms',
+    'newrelic.com',
+    'nr-data.net',
+    'optimizely.com',
+}
+
+class BlockRules(BaseModel):
+    """Which requests the RequestRouter aborts. A request is blocked if any rule matches."""
+    resource_types: Set[str] = set()    # Playwright resource types, e.g. 'image', 'font', 'media'
+    url_patterns: List[str] = []        # shell-style globs matched against the full url
+    domains: Set[str] = set()           # blocks the domain and all of its subdomains
+
+    @classmethod
+    def media_and_fonts(cls) -> 'BlockRules':
+        return cls(resource_types={'image', 'media', 'font'})
+
+    @classmethod
+    def trackers(cls) -> 'BlockRules':
+        return cls(domains=set(TRACKER_DOMAINS))
+
+    @classmethod
+    def from_presets(cls, *names: str) -> 'BlockRules':
+        """Combines presets by name: 'media+fonts', 'trackers'."""
+        rules = cls()
+        for name in names:
+            if name not in BLOCK_PRESETS:
+                raise ValueError(f"Unknown block preset '{name}'. Expected one of: {', '.join(BLOCK_PRESETS)}")
+            rules = rules.merge(BLOCK_PRESETS[name]())
+        return rules
+
+    def merge(self, other: 'BlockRules') -> 'BlockRules':
+        return BlockRules(
+            resource_types=self.resource_types | other.resource_types,
+            url_patterns=self.url_patterns + [p for p in other.url_patterns if p not in self.url_patterns],
+            domains=self.domains | other.domains,
+        )
+
+    def is_empty(self) -> bool:
+        return not (self.resource_types or self.url_patterns or self.domains)
+
+    def matches(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        if self.domains:
+            host = (urlsplit(url).hostname or '').lower()
+            if any(host == domain or host.endswith(f'.{domain}') for domain in self.domains):
+                return True
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.url_patterns)
+
+BLOCK_PRESETS = {
+    'media+fonts': BlockRules.media_and_fonts,
+    'trackers': BlockRules.trackers,
+}
+
+class RoutingStats(BaseModel):
+    requests: int = 0
+    blocked: int = 0
+    blocked_by_type: dict[str, int] = {}
+    estimated_bytes_saved: int = 0
+
+# Extra handlers run for requests that are not blocked. They return True when they took care of the route.
+RouteHandler = Callable[[Route, Request], Awaitable[bool]]
+
+class RequestRouter:
+    """
+    Intercepts every request of a BrowserContext: aborts the ones matching the block rules and
+    passes the rest through the extra handlers, then on to the network.
+    Note that Playwright disables Chromium's HTTP cache for contexts with routing enabled.
+    """
+
+    def __init__(self, block_rules: Optional[BlockRules] = None, handlers: Optional[List[RouteHandler]] = None):
+        self.block_rules = block_rules or BlockRules()
+        self.handlers: List[RouteHandler] = list(handlers or [])
+        self.stats = RoutingStats()
+        self._step_start = RoutingStats()
+
+    async def attach(self, context: BrowserContext) -> None:
+        await context.route('**/*', self._handle)
+
+    async def _handle(self, route: Route, request: Request) -> None:
+        self.stats.requests += 1
+        resource_type = request.resource_type
+        # The page's own document is never blocked, whatever the rules say. Iframe documents (ads,
+        # tracking pixels, social widgets) are subject to the rules like any other request.
+        if not self._is_main_frame_navigation(request) and self.block_rules.matches(request.url, resource_type):
+            self.stats.blocked += 1
+            self.stats.blocked_by_type[resource_type] = self.stats.blocked_by_type.get(resource_type, 0) + 1
+            self.stats.estimated_bytes_saved += ESTIMATED_BYTES_BY_TYPE.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort('blockedbyclient')
+            return
+        for handler in self.handlers:
+            try:
+                if await handler(route, request):
+                    return
+            except Exception as e:
+                logger.warning(f"Route handler failed for {request.url}: {e}")
+        await route.continue_()
+
+    @staticmethod
+    def _is_main_frame_navigation(request: Request) -> bool:
+        return request.is_navigation_request() and request.frame.parent_frame is None
+
+    def step_stats(self) -> RoutingStats:
+        """Stats since the previous call, to report them per agent step."""
+        current = self.stats.model_copy(deep=True)
+        previous = self._step_start
+        blocked_by_type = Counter(current.blocked_by_type)
+        blocked_by_type.subtract(previous.blocked_by_type)
+        self._step_start = current
+        return RoutingStats(
+            requests=current.requests - previous.requests,
+            blocked=current.blocked - previous.blocked,
+            blocked_by_type={k: v for k, v in blocked_by_type.items() if v},
+            estimated_bytes_saved=current.estimated_bytes_saved - previous.estimated_bytes_saved,
+        )
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from pydantic import BaseModel
+from auto_nav.agent import Agent
+from auto_nav.browser import LaunchProfile
+from auto_nav.browser_pool import BrowserPool, PoolStats
+
+logger = logging.getLogger(__name__)
+
+class TaskResult(BaseModel):
+    index: int
+    task: str
+    status: str                     # 'done', 'error' or 'timeout'
+    result: Optional[str] = None
+    error: Optional[str] = None
+    duration_s: float
+    metrics: Dict[str, dict] = {}   # Browser.metrics_summary() of the task's browser
+
+class RunStats(BaseModel):
+    tasks: int
+    done: int
+    errors: int
+    timeouts: int
+    wall_time_s: float
+    tasks_per_hour: float
+    avg_task_s: float
+    max_task_s: float
+    pool: PoolStats
+
+def load_tasks(path: str) -> List[str]:
+    """
+    Reads a batch of tasks. A .jsonl file holds one {"task": "..."} object per line,
+    any other file holds one task per line. Blank lines are skipped.
+    """
+    lines = [line.strip() for line in Path(path).read_text().splitlines()]
+    if path.endswith('.jsonl'):
+        return [json.loads(line)['task'] for line in lines if line]
+    return [line for line in lines if line]
+
+class TaskRunner:
+    """
+    Runs a batch of agent tasks concurrently. A BrowserPool of a few Chromium processes is launched
+    once and shared; every task gets its own BrowserContext (cookies, storage and cache are not
+    shared between tasks).
+    """
+
+    def __init__(
+        self,
+        llm,
+        concurrency: int = 4,
+        browser_processes: int = 1,
+        task_timeout_s: float = 600.0,
+        profile: Optional[LaunchProfile] = None,
+        max_tasks_per_browser: int = 50,
+        agent_kwargs: Optional[Dict[str, Any]] = None,
+        browser_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.llm = llm
+        self.concurrency = concurrency
+        self.browser_processes = browser_processes
+        self.task_timeout_s = task_timeout_s
+        self.agent_kwargs = agent_kwargs or {}
+        self.browser_kwargs = browser_kwargs or {}
+        self.results: List[TaskResult] = []
+        self.stats: Optional[RunStats] = None
+        self.pool = BrowserPool(
+            size=browser_processes,
+            contexts_per_browser=math.ceil(concurrency / browser_processes),
+            profile=profile,
+            max_tasks_per_browser=max_tasks_per_browser,
+            browser_kwargs=self.browser_kwargs,
+        )
+
+    async def run(self, tasks: Iterable[str]) -> List[TaskResult]:
+        """Runs every task and returns their results in input order. Stats end up in self.stats."""
+        tasks = list(tasks)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start_time = time.monotonic()
+        try:
+            await self.pool.start()
+
+            async def run_limited(index: int, task: str) -> TaskResult:
+                async with semaphore:
+                    return await self._run_task(index, task)
+
+            self.results = list(await asyncio.gather(*(run_limited(i, task) for i, task in enumerate(tasks))))
+        finally:
+            await self.pool.close()
+        self.stats = self._compute_stats(time.monotonic() - start_time)
+        return self.results
+
+    async def _run_task(self, index: int, task: str) -> TaskResult:
+        start_time = time.monotonic()
+        metrics: Dict[str, dict] = {}
+        try:
+            # Waiting for a browser counts against the timeout too
+            result = await asyncio.wait_for(self._run_agent(task, metrics), timeout=self.task_timeout_s)
+            return TaskResult(
+                index=index, task=task, status='done', result=result, duration_s=time.monotonic() - start_time, metrics=metrics
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Task {index} timed out after {self.task_timeout_s}s")
+            return TaskResult(
+                index=index,
+                task=task,
+                status='timeout',
+                error=f'Timed out after {self.task_timeout_s}s',
+                duration_s=time.monotonic() - start_time,
+                metrics=metrics,
+            )
+        except Exception as e:
+            logger.error(f"Task {index} failed: {e}")
+            return TaskResult(
+                index=index, task=task, status='error', error=str(e), duration_s=time.monotonic() - start_time, metrics=metrics
+            )
+
+    async def _run_agent(self, task: str, metrics: Dict[str, dict]) -> str:
+        """Runs the task on a pooled browser. The browser's metrics are put in `metrics`, even if the task fails."""
+        browser = await self.pool.acquire()
+        try:
+            agent = Agent(llm=self.llm, browser=browser, **self.agent_kwargs)
+            return await agent.interact(task)
+        finally:
+            metrics.update(browser.metrics_summary())
+            # The pool owns the browser, so agent.close() is not called: release() closes the context
+            await self.pool.release(browser)
+
+    def _compute_stats(self, wall_time_s: float) -> RunStats:
+        durations = [result.duration_s for result in self.results]
+        return RunStats(
+            tasks=len(self.results),
+            done=sum(result.status == 'done' for result in self.results),
+            errors=sum(result.status == 'error' for result in self.results),
+            timeouts=sum(result.status == 'timeout' for result in self.results),
+            wall_time_s=wall_time_s,
+            tasks_per_hour=len(self.results) / wall_time_s * 3600 if wall_time_s else 0.0,
+            avg_task_s=sum(durations) / len(durations) if durations else 0.0,
+            max_task_s=max(durations, default=0.0),
+            pool=self.pool.stats.model_copy(),
+        )
@@ -0,0 +1,92 @@
+import io
+from typing import Optional
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+HIGHLIGHT_COLOR = (255, 0, 0)
+LABEL_TEXT_COLOR = (255, 255, 255)
+
+def draw_element_labels(image_bytes: bytes, element_rects: dict[int, list[float]]) -> Image.Image:
+    """
+    Draws the red outline and index label of every element on a raw screenshot.
+    Rects are [x, y, width, height] in viewport CSS pixels, so the screenshot must be taken with scale='css'.
+    Returns the annotated image; the page itself is never touched.
+    """
+    image = load_image(image_bytes)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    width, height = image.size
+
+    for index, (x, y, w, h) in element_rects.items():
+        # Skip elements that are entirely outside the captured viewport
+        if x + w < 0 or y + h < 0 or x > width or y > height:
+            continue
+        draw.rectangle([x, y, x + w, y + h], outline=HIGHLIGHT_COLOR, width=2)
+
+        label = str(index)
+        left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+        label_width, label_height = right - left + 8, bottom - top + 4
+        # Same placement as the in-page labels: above the element, inside the image when it is at the top
+        label_x = min(max(x, 0), width - label_width)
+        label_y = y - label_height - 2 if y - label_height - 2 >= 0 else max(y, 0)
+        draw.rectangle([label_x, label_y, label_x + label_width, label_y + label_height], fill=HIGHLIGHT_COLOR)
+        draw.text((label_x + 4 - left, label_y + 2 - top), label, fill=LABEL_TEXT_COLOR, font=font)
+    return image
+
+def load_image(image_bytes: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(image_bytes)).convert('RGB')
+
+def prepare_image(image: Image.Image, grayscale: bool = False, max_dimension: Optional[int] = None) -> Image.Image:
+    """Applies the grayscale and downscaling options before encoding. Aspect ratio is preserved."""
+    if grayscale:
+        image = image.convert('L')
+    if max_dimension and max(image.size) > max_dimension:
+        image = image.copy()
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return image
+
+def encode_image(image: Image.Image, image_format: str = 'png', quality: int = 80) -> bytes:
+    """Encodes to 'png', 'jpeg' or 'webp'; quality only applies to the lossy formats."""
+    buffer = io.BytesIO()
+    if image_format == 'png':
+        image.save(buffer, format='PNG')
+    elif image_format == 'jpeg':
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    elif image_format == 'webp':
+        image.save(buffer, format='WEBP', quality=quality, method=4)
+    else:
+        raise ValueError(f"Unsupported screenshot format '{image_format}'. Expected png, jpeg or webp")
+    return buffer.getvalue()
+
+def perceptual_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """
+    Difference hash: shrinks the image to (hash_size + 1) x hash_size grayscale and sets one bit per
+    pixel that is brighter than its right neighbour. Frames that look the same get hashes that differ
+    in only a few bits.
+    """
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count('1')
+
+def frame_digest(image: Image.Image, cell_size: int = 4) -> Image.Image:
+    """
+    Grayscale copy of the frame averaged over cell_size x cell_size blocks. Unlike the perceptual hash,
+    whose cells span tens of pixels, a typed character or a ticked checkbox still changes some block.
+    """
+    width, height = image.size
+    size = (max(width // cell_size, 1), max(height // cell_size, 1))
+    return image.convert('L').resize(size, Image.Resampling.BOX)
+
+def digest_difference(first: Image.Image, second: Image.Image) -> int:
+    """Largest gray level difference between two digests' blocks, 255 when the frames differ in size."""
+    if first.size != second.size:
+        return 255
+    return ImageChops.difference(first, second).getextrema()[1]
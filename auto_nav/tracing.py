@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+class TraceEvent(BaseModel):
+    kind: str                       # 'span' or 'counter'
+    name: str
+    start_ms: float                 # since the tracer was created
+    duration_ms: float = 0.0        # spans only
+    value: float = 0.0              # counters only
+    task: Optional[str] = None      # the agent task the event belongs to
+    step: Optional[int] = None      # the agent step the event belongs to
+    track: str = ''                 # the asyncio task that recorded the event
+    attributes: dict[str, Any] = {}
+
+TraceHook = Callable[[TraceEvent], None]
+
+# The agent task and step of the code running, set per asyncio task so concurrent agents can share a tracer
+_trace_context: ContextVar[tuple[Optional[str], Optional[int]]] = ContextVar('autonav_trace_context', default=(None, None))
+
+class Tracer:
+    """
+    Records how long each stage of the agent loop takes (spans) and how much it handled (counters).
+
+    Every event is kept in self.events and passed to each hook as soon as it is recorded, so they can
+    be forwarded to another metrics system. Events are tagged with the agent task and step set by
+    set_context and with the asyncio task that recorded them. The events can be exported as JSONL
+    or as a Chrome trace-event file for chrome://tracing or https://ui.perfetto.dev.
+    One tracer can be shared by several Browser and Agent instances.
+    """
+
+    def __init__(self, hooks: Optional[list[TraceHook]] = None, keep_events: bool = True):
+        self.hooks: list[TraceHook] = list(hooks or [])
+        # Without keep_events, events only go to the hooks
+        self.keep_events = keep_events
+        self.events: list[TraceEvent] = []
+        self._origin = time.perf_counter()
+
+    def add_hook(self, hook: TraceHook) -> None:
+        self.hooks.append(hook)
+
+    def set_context(self, task: Optional[str] = None, step: Optional[int] = None) -> None:
+        """Tags the events of the current asyncio task, and of the tasks it starts, with task and step."""
+        _trace_context.set((task, step))
+
+    def set_step(self, step: int) -> None:
+        _trace_context.set((_trace_context.get()[0], step))
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict[str, Any]]:
+        """Times the block. Attributes added to the yielded dict are recorded with the span."""
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            end = time.perf_counter()
+            self._record(TraceEvent(
+                kind='span',
+                name=name,
+                start_ms=(start - self._origin) * 1000,
+                duration_ms=(end - start) * 1000,
+                attributes=attributes,
+            ))
+
+    def count(self, name: str, value: float, **attributes) -> None:
+        self._record(TraceEvent(
+            kind='counter',
+            name=name,
+            start_ms=(time.perf_counter() - self._origin) * 1000,
+            value=value,
+            attributes=attributes,
+        ))
+
+    def _record(self, event: TraceEvent) -> None:
+        event.task, event.step = _trace_context.get()
+        event.track = _current_track()
+        if self.keep_events:
+            self.events.append(event)
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Trace hook {hook!r} failed: {e}")
+
+    def summary(self) -> dict:
+        """Count, total and mean duration of every span name, and the total of every counter."""
+        spans: dict[str, dict[str, float]] = {}
+        counters: dict[str, float] = {}
+        for event in self.events:
+            if event.kind == 'span':
+                entry = spans.setdefault(event.name, {'count': 0, 'total_ms': 0.0})
+                entry['count'] += 1
+                entry['total_ms'] += event.duration_ms
+            else:
+                counters[event.name] = counters.get(event.name, 0) + event.value
+        for entry in spans.values():
+            entry['mean_ms'] = round(entry['total_ms'] / entry['count'], 2)
+            entry['total_ms'] = round(entry['total_ms'], 2)
+        return {'spans': spans, 'counters': counters}
+
+    def export_jsonl(self, path: str) -> None:
+        with open(path, 'w') as file:
+            for event in self.events:
+                file.write(event.model_dump_json() + '\n')
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Writes the events in the Chrome trace-event format: spans as complete events, counters as counter events."""
+        tracks: dict[str, int] = {}
+        trace_events = []
+        for event in self.events:
+            args = {**event.attributes, 'task': event.task, 'step': event.step}
+            tid = tracks.setdefault(event.track, len(tracks) + 1)
+            if event.kind == 'span':
+                trace_events.append({
+                    'name': event.name,
+                    'cat': event.name.split('.')[0],
+                    'ph': 'X',
+                    'ts': event.start_ms * 1000,
+                    'dur': event.duration_ms * 1000,
+                    'pid': 1,
+                    'tid': tid,
+                    'args': args,
+                })
+            else:
+                trace_events.append({
+                    'name': event.name,
+                    'ph': 'C',
+                    'ts': event.start_ms * 1000,
+                    'pid': 1,
+                    'args': {event.name: event.value},
+                })
+        trace_events.extend(
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': track}}
+            for track, tid in tracks.items()
+        )
+        Path(path).write_text(json.dumps({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}))
+
+def trace_span(tracer: Optional[Tracer], name: str, **attributes):
+    """tracer.span, or a no-op when there is no tracer. Yields a dict of attributes either way."""
+    return tracer.span(name, **attributes) if tracer else nullcontext(attributes)
+
+def _current_track() -> str:
+    """The asyncio task, or the thread for code run with asyncio.to_thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task else threading.current_thread().name
@@ -0,0 +1,87 @@
+"""
+End-to-end agent benchmark: runs the agent loop against the local mock store with a scripted chat model,
+so it needs neither an LLM nor the internet and every run takes the same actions.
+
+Reports steps per second, wall time per task, the time spent in every stage of a step and the share of
+it spent waiting for pages to settle (Browser.wait_for_page_load).
+
+    python -m benchmarks.bench_agent --tasks 8 --concurrency 4
+    python -m benchmarks.bench_agent --tasks 8 --llm-latency-ms 800 --stream --trace-dir traces
+"""
+import argparse
+import asyncio
+import os
+import statistics
+
+from auto_nav.browser import LaunchProfile
+from auto_nav.dom_utils import DOM_ENGINES
+from auto_nav.runner import TaskRunner
+from auto_nav.tracing import Tracer
+from benchmarks.common import percentile
+from benchmarks.mock_store import serve_store
+from benchmarks.scripted_llm import ScriptedChatModel, store_script
+
+TASK = 'Search the store for {query} and add the {product} to the cart'
+
+# Top-level stages of a step; the other spans (dom.*, screenshot.*) are recorded within them
+STAGES = ['llm', 'tool', 'wait', 'observation', 'dom.extract', 'screenshot.capture', 'screenshot.encode']
+
+
+async def run(args) -> None:
+    tracer = Tracer()
+    with serve_store() as (base_url, added_to_cart):
+        llm = ScriptedChatModel(store_script(base_url, args.query, args.product), latency_ms=args.llm_latency_ms)
+        runner = TaskRunner(
+            llm=llm,
+            concurrency=args.concurrency,
+            browser_processes=args.browser_processes,
+            profile=LaunchProfile.lean() if args.profile == 'lean' else LaunchProfile.headless_profile(),
+            agent_kwargs={'streaming': args.stream, 'tracer': tracer, 'max_iterations': 20},
+            browser_kwargs={'dom_engine': args.dom_engine},
+        )
+        results = await runner.run([TASK.format(query=args.query, product=args.product)] * args.tasks)
+
+    stats = runner.stats
+    durations = [result.duration_s for result in results]
+    summary = tracer.summary()
+    spans = summary['spans']
+    steps = spans.get('llm', {}).get('count', 0)
+    task_time_ms = sum(durations) * 1000
+
+    print(f'\nTasks: {stats.done} done, {stats.errors} errors, {stats.timeouts} timeouts; '
+          f'{len(added_to_cart)} of {args.tasks} added the product to the cart')
+    print(f'Wall time {stats.wall_time_s:.2f} s   {steps} steps   {steps / stats.wall_time_s:.2f} steps/s   '
+          f'{stats.tasks_per_hour:.0f} tasks/hour')
+    print(f'Task time  median {statistics.median(durations):.2f} s   p90 {percentile(durations, 0.9):.2f} s   '
+          f'max {max(durations):.2f} s')
+    print('Time by stage (summed over tasks; stages overlap, e.g. tool includes its wait)')
+    for stage in STAGES:
+        if stage in spans:
+            entry = spans[stage]
+            print(f'  {stage:20s} {entry["total_ms"]:10.0f} ms   {entry["count"]:5d} x {entry["mean_ms"]:8.1f} ms   '
+                  f'{entry["total_ms"] / task_time_ms * 100:5.1f}% of task time')
+    wait_ms = spans.get('wait', {}).get('total_ms', 0.0)
+    print(f'Waiting for pages to settle: {wait_ms / 1000:.2f} s, {wait_ms / task_time_ms * 100:.1f}% of task time')
+    if llm.unresolved_targets:
+        print(f'The scripted model had to wait {llm.unresolved_targets} time(s) for an element to appear')
+
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+        tracer.export_jsonl(os.path.join(args.trace_dir, 'trace.jsonl'))
+        tracer.export_chrome_trace(os.path.join(args.trace_dir, 'trace.json'))
+        print(f'Trace written to {args.trace_dir}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--browser-processes', type=int, default=1)
+    parser.add_argument('--profile', choices=['headless', 'lean'], default='lean')
+    parser.add_argument('--dom-engine', choices=DOM_ENGINES, default='soup')
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help='Simulated generation time of every LLM response')
+    parser.add_argument('--stream', action='store_true', help='Use the streaming agent loop')
+    parser.add_argument('--query', default='hp laptop')
+    parser.add_argument('--product', default='HP Laptop 15')
+    parser.add_argument('--trace-dir', help='Also write the trace of the run as JSONL and a Chrome trace')
+    asyncio.run(run(parser.parse_args()))
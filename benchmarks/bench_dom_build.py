@@ -0,0 +1,69 @@
+"""
+Times the Python side of get_elements (parse, traversal, check result records, DOM build) and its peak
+memory, without a browser: a stand-in page answers the visibility checks with every node visible.
+
+    python -m benchmarks.bench_dom_build --repeat 5 --siblings 5000 20000
+"""
+import argparse
+import asyncio
+import json
+import re
+import tracemalloc
+
+from auto_nav.dom_utils import get_elements
+from benchmarks.common import FIXTURES_DIR, fixture_paths, summarize, time_async, wide_page
+
+CHECK_INPUT = re.compile(r'const (elements|texts) = (\{.*?\});\n', re.DOTALL)
+
+
+class AllVisiblePage:
+    """Just enough of a Playwright page for get_elements: every element is visible and on top."""
+
+    def __init__(self, html: str):
+        self.html = html
+
+    async def wait_for_load_state(self, state: str) -> None:
+        pass
+
+    async def content(self) -> str:
+        return self.html
+
+    async def evaluate(self, script: str):
+        kind, data = CHECK_INPUT.search(script).groups()
+        if kind == 'elements':
+            return {
+                xpath: {'xpath': xpath, 'isVisible': True, 'isTopElement': True, 'rect': [0, 0, 10, 10], 'stableId': None}
+                for xpath in json.loads(data)
+            }
+        return {xpath: {'xpath': xpath, 'isVisible': True} for xpath in json.loads(data)}
+
+
+async def measure(name: str, html: str, repeat: int) -> None:
+    page = AllVisiblePage(html)
+    dom = await get_elements(page)
+    timings = await time_async(lambda: get_elements(page), repeat)
+    tracemalloc.start()
+    try:
+        dom = await get_elements(page)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(
+        f'{name:24s} {summarize(timings)}   peak {peak / 1024:8.0f} KiB   '
+        f'DOM {retained / 1024:7.0f} KiB   items {len(dom.elements):6d}'
+    )
+
+
+async def run(repeat: int, sibling_counts: list[int]) -> None:
+    for path in fixture_paths(FIXTURES_DIR):
+        await measure(path.name, path.read_text(), repeat)
+    for siblings in sibling_counts:
+        await measure(f'wide page x{siblings}', wide_page(siblings), repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--siblings', type=int, nargs='*', default=[5000, 20000])
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat, args.siblings))
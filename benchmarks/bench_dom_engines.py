@@ -0,0 +1,41 @@
+"""
+Compares the BeautifulSoup ('soup') and in-page ('js') DOM extraction engines on saved HTML pages.
+
+    python -m benchmarks.bench_dom_engines --repeat 5
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from auto_nav.dom_utils import DOM_ENGINES, extract_dom
+from benchmarks.common import FIXTURES_DIR, fixture_paths, summarize, time_async
+
+
+async def run(fixtures_dir: Path, repeat: int) -> None:
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    page = await browser.new_page(viewport={'width': 1280, 'height': 800})
+    try:
+        for path in fixture_paths(fixtures_dir):
+            await page.goto(path.resolve().as_uri())
+            print(f'\n{path.name} ({path.stat().st_size // 1024} KiB)')
+            for engine in DOM_ENGINES:
+                dom = await extract_dom(page, engine)
+                timings = await time_async(lambda: extract_dom(page, engine), repeat)
+                print(
+                    f'  {engine:5s} {summarize(timings)}   '
+                    f'items {len(dom.elements):5d}   interactive {len(dom.element_map):5d}'
+                )
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.fixtures, args.repeat))
@@ -0,0 +1,64 @@
+"""
+Compares launch profiles (headed, headless, lean) on the saved HTML pages: startup time, the latency of
+one agent step (update_dom + take_screenshot) and the memory of the Chromium process tree.
+
+    python -m benchmarks.bench_launch_profiles --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from auto_nav.browser import Browser, LaunchProfile
+from auto_nav.browser_pool import process_tree_memory_mb
+from benchmarks.common import FIXTURES_DIR, fixture_paths, summarize, time_async
+
+PROFILES = {
+    'headed': LaunchProfile(),
+    'headless': LaunchProfile.headless_profile(),
+    'lean': LaunchProfile.lean(),
+}
+
+
+async def step(browser: Browser) -> None:
+    await browser.update_dom()
+    await browser.take_screenshot()
+
+
+async def run_profile(name: str, profile: LaunchProfile, fixtures_dir: Path, repeat: int) -> None:
+    start = time.perf_counter()
+    browser = Browser(profile=profile)
+    await browser.start()
+    startup_ms = (time.perf_counter() - start) * 1000
+    try:
+        print(f'\n{name}: startup {startup_ms:.0f} ms')
+        peak_memory = 0.0
+        for path in fixture_paths(fixtures_dir):
+            await browser.navigate_to_url(path.resolve().as_uri())
+            timings = await time_async(lambda: step(browser), repeat)
+            memory = await process_tree_memory_mb(browser.browser)
+            peak_memory = max(peak_memory, memory or 0.0)
+            memory_text = f'{memory:7.0f} MB' if memory is not None else '    n/a'
+            print(f'  {path.name:22s} step {summarize(timings)}   memory {memory_text}')
+        print(f'  peak memory {peak_memory:.0f} MB')
+    finally:
+        await browser.close()
+
+
+async def run(profiles: list[str], fixtures_dir: Path, repeat: int) -> None:
+    for name in profiles:
+        if not PROFILES[name].headless and sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+            print(f'\n{name}: skipped, no display available')
+            continue
+        await run_profile(name, PROFILES[name], fixtures_dir, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.profiles, args.fixtures, args.repeat))
@@ -0,0 +1,49 @@
+"""
+Compares the prompt size of the legacy and compact dom_to_string serializations on saved HTML pages.
+
+    python -m benchmarks.bench_prompt_size
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from auto_nav.dom_utils import DOM_ENGINES, dom_to_string, extract_dom
+from auto_nav.memory import CHARS_PER_TOKEN
+from benchmarks.common import FIXTURES_DIR, fixture_paths
+
+
+async def run(fixtures_dir: Path) -> None:
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    page = await browser.new_page(viewport={'width': 1280, 'height': 800})
+    totals = {engine: [0, 0] for engine in DOM_ENGINES}
+    try:
+        for path in fixture_paths(fixtures_dir):
+            await page.goto(path.resolve().as_uri())
+            print(f'\n{path.name} ({path.stat().st_size // 1024} KiB)')
+            for engine in DOM_ENGINES:
+                dom = await extract_dom(page, engine)
+                legacy = len(dom_to_string(dom.elements)) // CHARS_PER_TOKEN
+                compact = len(dom_to_string(dom.elements, compact=True)) // CHARS_PER_TOKEN
+                totals[engine][0] += legacy
+                totals[engine][1] += compact
+                print(f'  {engine:5s} legacy {legacy:8d} tokens   compact {compact:8d} tokens   {_saving(legacy, compact)}')
+        print('\nAll pages')
+        for engine, (legacy, compact) in totals.items():
+            print(f'  {engine:5s} legacy {legacy:8d} tokens   compact {compact:8d} tokens   {_saving(legacy, compact)}')
+    finally:
+        await browser.close()
+        await playwright.stop()
+
+
+def _saving(legacy: int, compact: int) -> str:
+    return f'-{(1 - compact / legacy) * 100:.1f}%' if legacy else '-'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Directory of saved .html pages')
+    args = parser.parse_args()
+    asyncio.run(run(args.fixtures))
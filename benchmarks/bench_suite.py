@@ -0,0 +1,173 @@
+"""
+Offline benchmark suite for DOM extraction and observation building.
+
+Serves the fixture pages from a local HTTP server to headless Chromium and measures, for every page,
+DOM engine and mode: extraction latency percentiles, dom_to_string time, create_observation_message
+latency, peak Python memory, the page's JS heap, element counts and the serialized size.
+Results can be stored as a baseline and later runs compared against it; the run fails when a
+metric got worse than the baseline by more than the tolerance.
+
+    python -m benchmarks.bench_suite --repeat 10
+    python -m benchmarks.bench_suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from playwright.async_api import Page, async_playwright
+
+from auto_nav.browser import Browser, WaitConfig
+from auto_nav.dom_utils import DOM_ENGINES, dom_to_string, extract_dom
+from auto_nav.memory import CHARS_PER_TOKEN
+from auto_nav.prompt_utils import create_observation_message
+from benchmarks.common import FIXTURES_DIR, fixture_paths, percentile, serve_directory, time_async
+
+# Browser options of every mode; extraction and serialization use the matching extract_dom/dom_to_string arguments
+MODES = {
+    'full': {},
+    'compact': {'compact_dom': True},
+    'viewport': {'viewport_margin': 800},
+}
+
+# Metrics compared with the baseline, lower is better. Counts and sizes are compared too: a change
+# there means the extraction output changed, not only its speed.
+COMPARED_METRICS = [
+    'extract_p50_ms', 'extract_p90_ms', 'serialize_p50_ms', 'observation_p50_ms',
+    'peak_python_kib', 'tokens',
+]
+EXACT_METRICS = ['elements', 'items']
+
+# Differences below these are measurement noise, whatever the tolerance
+MIN_DIFFERENCE = {'ms': 2.0, 'kib': 64.0, 'tokens': 0.0}
+
+
+async def measure(page: Page, engine: str, mode: dict, repeat: int) -> dict:
+    """Extraction and serialization metrics of the page already loaded in page."""
+    viewport_margin = mode.get('viewport_margin')
+    compact = mode.get('compact_dom', False)
+    dom = await extract_dom(page, engine, viewport_margin=viewport_margin)
+    extract_ms = await time_async(lambda: extract_dom(page, engine, viewport_margin=viewport_margin), repeat)
+
+    serialize_ms = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = dom_to_string(dom.elements, compact)
+        serialize_ms.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        await extract_dom(page, engine, viewport_margin=viewport_margin)
+        dom_to_string(dom.elements, compact)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    js_heap = await page.evaluate('performance.memory ? performance.memory.usedJSHeapSize : 0')
+
+    return {
+        'extract_p50_ms': percentile(extract_ms, 0.5),
+        'extract_p90_ms': percentile(extract_ms, 0.9),
+        'extract_p99_ms': percentile(extract_ms, 0.99),
+        'serialize_p50_ms': percentile(serialize_ms, 0.5),
+        'peak_python_kib': peak / 1024,
+        'js_heap_kib': js_heap / 1024,
+        'elements': len(dom.element_map),
+        'items': len(dom.elements),
+        'chars': len(text),
+        'tokens': len(text) // CHARS_PER_TOKEN,
+    }
+
+
+async def measure_observation(browser: Browser, repeat: int) -> dict:
+    timings = await time_async(lambda: create_observation_message(browser, 1, 1), repeat)
+    return {
+        'observation_p50_ms': percentile(timings, 0.5),
+        'observation_p90_ms': percentile(timings, 0.9),
+    }
+
+
+async def run(fixtures_dir: Path, repeat: int) -> dict:
+    results = {}
+    playwright = await async_playwright().start()
+    chromium = await playwright.chromium.launch(headless=True)
+    try:
+        with serve_directory(fixtures_dir) as base_url:
+            for path in fixture_paths(fixtures_dir):
+                print(f'\n{path.name} ({path.stat().st_size // 1024} KiB)')
+                for engine in DOM_ENGINES:
+                    for mode_name, mode in MODES.items():
+                        if 'viewport_margin' in mode and engine != 'js':
+                            continue
+                        # A Browser of its own per run, like an agent step, sharing the Chromium process
+                        browser = Browser(
+                            playwright_browser=chromium,
+                            dom_engine=engine,
+                            wait_config=WaitConfig(network_idle_ms=100, dom_quiet_ms=100),
+                            **mode,
+                        )
+                        await browser.start()
+                        try:
+                            await browser.navigate_to_url(f'{base_url}/{path.name}')
+                            metrics = await measure(browser.get_page(), engine, mode, repeat)
+                            metrics.update(await measure_observation(browser, repeat))
+                        finally:
+                            await browser.close()
+                        results[f'{path.stem}/{engine}/{mode_name}'] = metrics
+                        print(
+                            f'  {engine:4s} {mode_name:8s} '
+                            f'extract p50 {metrics["extract_p50_ms"]:7.1f} p90 {metrics["extract_p90_ms"]:7.1f} '
+                            f'p99 {metrics["extract_p99_ms"]:7.1f} ms   '
+                            f'serialize {metrics["serialize_p50_ms"]:5.1f} ms   '
+                            f'observation {metrics["observation_p50_ms"]:7.1f} ms   '
+                            f'peak {metrics["peak_python_kib"]:7.0f} KiB   '
+                            f'elements {metrics["elements"]:5d}   tokens {metrics["tokens"]:6d}'
+                        )
+    finally:
+        await chromium.close()
+        await playwright.stop()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lists the metrics that regressed beyond the tolerance, and the counts that changed."""
+    problems = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f'  {key}: not in the baseline')
+            continue
+        for name in COMPARED_METRICS:
+            old, new = base.get(name), metrics[name]
+            if old is None:
+                continue
+            unit = next((unit for unit in MIN_DIFFERENCE if name.endswith(unit)), 'tokens')
+            if new > old * (1 + tolerance) and new - old > MIN_DIFFERENCE[unit]:
+                problems.append(f'{key}: {name} {old:.1f} -> {new:.1f} (+{(new / old - 1) * 100 if old else 100:.0f}%)')
+        for name in EXACT_METRICS:
+            if name in base and base[name] != metrics[name]:
+                problems.append(f'{key}: {name} changed {base[name]} -> {metrics[name]}')
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--baseline', type=Path, help='Baseline JSON to compare the results with')
+    parser.add_argument('--save-baseline', type=Path, help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before a metric counts as a regression')
+    args = parser.parse_args()
+    results = asyncio.run(run(args.fixtures, args.repeat))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f'\nBaseline written to {args.save_baseline}')
+    if args.baseline:
+        problems = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        print(f'\nCompared with {args.baseline}: {len(problems)} regression(s)')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,52 @@
+"""
+Times the get_elements traversal (XPath, sibling index and depth construction, text node collection)
+on wide and text-heavy synthetic pages. Runs offline on the BeautifulSoup parse; no browser needed.
+
+    python -m benchmarks.bench_traversal --siblings 1000 5000 10000 20000 --text-nodes 5000 50000
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from auto_nav.dom_utils import _collect_nodes
+from benchmarks.common import text_heavy_page, wide_page
+
+
+def run(sibling_counts: list[int], text_node_counts: list[int]) -> None:
+    print('Wide pages')
+    for siblings in sibling_counts:
+        soup = BeautifulSoup(wide_page(siblings), 'html.parser')
+        start = time.perf_counter()
+        interactive_elements, text_nodes = _collect_nodes(soup.body)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        # Every <li> must get its own positional index; the last anchor closes the sequence.
+        last_xpath = f'//div[1]/ul[1]/li[{siblings}]/a[1]'
+        assert last_xpath in interactive_elements, f'missing {last_xpath}'
+        assert interactive_elements[last_xpath][2] == 4
+        print(
+            f'siblings {siblings:6d}   traversal {elapsed:9.1f} ms   '
+            f'per node {elapsed * 1000 / siblings:7.1f} us   '
+            f'elements {len(interactive_elements):6d}   texts {len(text_nodes):6d}'
+        )
+
+    print('Text-heavy pages')
+    for count in text_node_counts:
+        soup = BeautifulSoup(text_heavy_page(count), 'html.parser')
+        start = time.perf_counter()
+        interactive_elements, text_nodes = _collect_nodes(soup.body)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(
+            f'text nodes {count:6d}   traversal {elapsed:9.1f} ms   '
+            f'per node {elapsed * 1000 / count:7.1f} us   '
+            f'elements {len(interactive_elements):6d}   texts {len(text_nodes):6d}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--siblings', type=int, nargs='+', default=[1000, 5000, 10000, 20000])
+    parser.add_argument('--text-nodes', type=int, nargs='+', default=[5000, 20000, 50000])
+    args = parser.parse_args()
+    run(args.siblings, args.text_nodes)
@@ -0,0 +1,71 @@
+import functools
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Iterator, List
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+def fixture_paths(fixtures_dir: Path = FIXTURES_DIR) -> List[Path]:
+    """Saved HTML pages used by the benchmarks. Drop more pages into the directory to extend the corpus."""
+    return sorted(fixtures_dir.glob('*.html'))
+
+
+async def time_async(func: Callable[[], Awaitable], repeat: int) -> List[float]:
+    """Runs func `repeat` times and returns the wall time of every run in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: Iterable[float]) -> str:
+    timings = sorted(timings)
+    return f'median {statistics.median(timings):8.1f} ms   min {timings[0]:8.1f} ms   max {timings[-1]:8.1f} ms'
+
+
+def percentile(timings: Iterable[float], fraction: float) -> float:
+    """Nearest-rank percentile, e.g. fraction=0.9 for p90."""
+    timings = sorted(timings)
+    return timings[min(int(fraction * len(timings)), len(timings) - 1)]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: Path) -> Iterator[str]:
+    """Serves directory over HTTP on a free localhost port and yields the base url, e.g. http://127.0.0.1:8123."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def wide_page(siblings: int) -> str:
+    """A product-grid style page: one container with `siblings` children of the same tag."""
+    items = ''.join(
+        f'<li class="item"><a href="/p/{i}">Item {i}</a> <span>${i}.99</span></li>' for i in range(siblings)
+    )
+    return f'<html><body><div id="grid"><ul>{items}</ul></div></body></html>'
+
+
+def text_heavy_page(text_nodes: int) -> str:
+    """A reviews/docs style page with roughly `text_nodes` non-empty text nodes spread over paragraphs."""
+    paragraphs = ''.join(
+        f'<div class="review"><p>Review {i} starts here <b>rated {i % 5 + 1}</b> and ends here.</p></div>'
+        for i in range(text_nodes // 3)
+    )
+    return f'<html><body><main>{paragraphs}</main></body></html>'
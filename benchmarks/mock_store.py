@@ -0,0 +1,124 @@
+"""
+A small local store site for end-to-end agent benchmarks: a home page with a search box, search
+results, product pages and a cart kept in a cookie, so concurrent tasks do not share a cart.
+"""
+import html
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+PRODUCTS = [
+    {'id': i, 'name': f'{brand} {kind} {model}', 'price': 199 + i * 37 % 900}
+    for i, (brand, kind, model) in enumerate(
+        (brand, kind, model)
+        for brand in ('HP', 'Dell', 'Lenovo', 'Asus', 'Acer')
+        for kind in ('Laptop', 'Monitor', 'Keyboard', 'Mouse')
+        for model in ('14', '15', 'Pro', 'Air')
+    )
+]
+
+STYLE = """
+body { font-family: sans-serif; margin: 0; }
+header { display: flex; gap: 12px; padding: 12px; background: #232f3e; }
+header a { color: white; }
+.results { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; padding: 12px; }
+.card { border: 1px solid #ddd; padding: 12px; }
+"""
+
+
+def _page(title: str, body: str, query: str = '') -> bytes:
+    return f"""<!DOCTYPE html>
+<html><head><title>{html.escape(title)} - Mock Store</title><style>{STYLE}</style></head>
+<body>
+<header>
+  <a href="/" id="logo" aria-label="Home">Mock Store</a>
+  <form action="/search" method="get" role="search">
+    <input type="text" name="q" id="search-box" placeholder="Search products" aria-label="Search" value="{html.escape(query)}">
+    <button type="submit" id="search-submit">Search</button>
+  </form>
+  <a href="/cart" id="cart-link">Cart</a>
+</header>
+<main>{body}</main>
+</body></html>""".encode()
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    # Set by serve_store; counts successful add-to-cart requests of every task
+    added_to_cart: list
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        cart = [int(item) for item in self._cookie('cart').split(',') if item.isdigit()]
+        if url.path == '/':
+            self._send(_page('Home', '<h1>Welcome</h1><p>Search for laptops, monitors and more.</p>'))
+        elif url.path == '/search':
+            query = params.get('q', [''])[0]
+            words = query.lower().split()
+            matches = [product for product in PRODUCTS if all(word in product['name'].lower() for word in words)]
+            cards = ''.join(
+                f'<div class="card"><a href="/product/{product["id"]}">{html.escape(product["name"])}</a>'
+                f'<p>${product["price"]}</p></div>'
+                for product in matches
+            )
+            self._send(_page(f'Results for {query}', f'<h1>{len(matches)} results</h1><div class="results">{cards}</div>', query))
+        elif url.path.startswith('/product/'):
+            product = self._product(url.path.rsplit('/', 1)[-1])
+            if product is None:
+                return self._send(_page('Not found', '<h1>Product not found</h1>'), status=404)
+            self._send(_page(product['name'], (
+                f'<h1>{html.escape(product["name"])}</h1><p>${product["price"]}</p>'
+                f'<form action="/cart/add" method="get"><input type="hidden" name="id" value="{product["id"]}">'
+                '<button type="submit" id="add-to-cart">Add to cart</button></form>'
+            )))
+        elif url.path == '/cart/add':
+            product = self._product(params.get('id', [''])[0])
+            if product is None:
+                return self._send(_page('Not found', '<h1>Product not found</h1>'), status=404)
+            self.added_to_cart.append(product['id'])
+            self.send_response(303)
+            self.send_header('Location', '/cart')
+            self.send_header('Set-Cookie', f'cart={",".join(map(str, cart + [product["id"]]))}; Path=/')
+            self.end_headers()
+        elif url.path == '/cart':
+            items = ''.join(f'<li>{html.escape(PRODUCTS[item]["name"])}</li>' for item in cart if item < len(PRODUCTS))
+            self._send(_page('Cart', f'<h1>Cart ({len(cart)} items)</h1><ul>{items}</ul>'))
+        else:
+            self._send(_page('Not found', '<h1>Page not found</h1>'), status=404)
+
+    def _product(self, product_id: str):
+        return PRODUCTS[int(product_id)] if product_id.isdigit() and int(product_id) < len(PRODUCTS) else None
+
+    def _cookie(self, name: str) -> str:
+        for part in self.headers.get('Cookie', '').split(';'):
+            key, _, value = part.strip().partition('=')
+            if key == name:
+                return value
+        return ''
+
+    def _send(self, body: bytes, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_store() -> Iterator[tuple[str, list]]:
+    """Runs the store on a free localhost port. Yields its base url and the list of product ids added to carts."""
+    added_to_cart: list = []
+    handler = type('Handler', (StoreHandler,), {'added_to_cart': added_to_cart})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}', added_to_cart
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,99 @@
+"""
+A deterministic stand-in for the chat model, for benchmarking the agent loop without an LLM.
+
+It follows a script of tool calls. Calls that take an element index name their element by a piece
+of its text instead (target), which is looked up in the latest observation, so scripts keep working
+whatever the DOM engine or index scheme. The model keeps no state: the step is the number of tool
+call responses in the history, so one instance can serve concurrent agents.
+"""
+import asyncio
+import json
+import re
+from typing import AsyncIterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from pydantic import BaseModel
+
+ELEMENT_LINE = re.compile(r'^(\d+)\[:\]\s*(.*)$', re.MULTILINE)
+
+
+class ScriptStep(BaseModel):
+    tool: str
+    args: dict = {}
+    target: Optional[str] = None    # text of the element whose index goes in args['index']
+
+
+class ScriptedChatModel:
+    def __init__(self, script: List[ScriptStep], latency_ms: float = 0.0, final_answer: str = 'Done.'):
+        self.script = script
+        # Simulated generation time of every response
+        self.latency_ms = latency_ms
+        self.final_answer = final_answer
+        self.calls = 0
+        self.unresolved_targets = 0
+
+    def bind_tools(self, tools) -> 'ScriptedChatModel':
+        return self
+
+    async def ainvoke(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._respond(messages)
+
+    async def astream(self, messages: List[BaseMessage]) -> AsyncIterator[AIMessageChunk]:
+        response = await self.ainvoke(messages)
+        if response.content:
+            yield AIMessageChunk(content=response.content)
+        for position, tool_call in enumerate(response.tool_calls):
+            yield AIMessageChunk(content='', tool_call_chunks=[{
+                'name': tool_call['name'],
+                'args': json.dumps(tool_call['args']),
+                'id': tool_call['id'],
+                'index': position,
+            }])
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        step = sum(isinstance(message, AIMessage) and bool(message.tool_calls) for message in messages)
+        if step >= len(self.script):
+            return AIMessage(content=self.final_answer)
+        entry = self.script[step]
+        args = dict(entry.args)
+        if entry.target is not None:
+            index = find_index(latest_observation(messages), entry.target)
+            if index is None:
+                # Like a model waiting for the page: no action, the same step is tried on the next observation
+                self.unresolved_targets += 1
+                return AIMessage(content=f'Waiting for "{entry.target}" to appear.')
+            args['index'] = index
+        content = self.final_answer if entry.tool == 'ultimate_task_done' else ''
+        return AIMessage(content=content, tool_calls=[{'name': entry.tool, 'args': args, 'id': f'call-{step}'}])
+
+
+def latest_observation(messages: List[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) and isinstance(message.content, list):
+            text = message.content[0].get('text', '') if isinstance(message.content[0], dict) else ''
+            if 'Interactive elements of the page:' in text:
+                return text
+    return ''
+
+
+def find_index(observation: str, target: str) -> Optional[int]:
+    """Index of the first interactive element whose line contains target."""
+    for index, line in ELEMENT_LINE.findall(observation):
+        if target in line:
+            return int(index)
+    return None
+
+
+def store_script(base_url: str, query: str, product: str) -> List[ScriptStep]:
+    """Searches the mock store for query, opens product and adds it to the cart."""
+    return [
+        ScriptStep(tool='navigate_to_url', args={'url': f'{base_url}/'}),
+        ScriptStep(tool='type_into_element_by_index', args={'text': query}, target='id="search-box"'),
+        ScriptStep(tool='press_enter_key'),
+        ScriptStep(tool='click_element_by_index', target=f'>{product}</a>'),
+        ScriptStep(tool='click_element_by_index', target='Add to cart'),
+        ScriptStep(tool='ultimate_task_done'),
+    ]
@@ -1,8 +1,16 @@
 import os
 import asyncio
+import argparse
+from typing import Optional
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from auto_nav.agent import Agent 
+from auto_nav.browser import Browser, LaunchProfile
+from auto_nav.plan_cache import PlanCache
+from auto_nav.response_cache import ResponseCache
+from auto_nav.routing import BLOCK_PRESETS, BlockRules
+from auto_nav.runner import TaskRunner, load_tasks
+from auto_nav.tracing import Tracer
 
 # --- Environment Setup ---
 load_dotenv()
@@ -20,8 +28,17 @@ task = (
 )
 
 llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash', api_key=api_key)
-async def main():
-    agent = Agent(llm=llm)
+
+# 'headless' and 'lean' are meant for machines without a display
+PROFILES = {
+    'headed': LaunchProfile,
+    'headless': LaunchProfile.headless_profile,
+    'lean': LaunchProfile.lean,
+}
+
+async def main(profile: LaunchProfile, block_rules: BlockRules, cache: Optional[ResponseCache], agent_kwargs: dict):
+    browser = Browser(profile=profile, block_rules=block_rules, response_cache=cache)
+    agent = Agent(llm=llm, browser=browser, **agent_kwargs)
     final_result = None
     try:
         final_result = await agent.interact(task)
@@ -35,12 +52,76 @@ async def main():
     print("\n--- Final Agent Output ---")
     print(final_result if final_result is not None else "Failed to retrieve the final result.")
     print("--------------------------")
+    for kind, summary in browser.metrics_summary().items():
+        print(f"--- Browser {kind}: {summary} ---")
+
+
+async def run_batch(
+    tasks_path: str,
+    concurrency: int,
+    timeout_s: float,
+    profile: LaunchProfile,
+    block_rules: BlockRules,
+    cache: Optional[ResponseCache],
+    agent_kwargs: dict,
+):
+    runner = TaskRunner(
+        llm=llm,
+        concurrency=concurrency,
+        task_timeout_s=timeout_s,
+        profile=profile,
+        agent_kwargs=agent_kwargs,
+        browser_kwargs={'block_rules': block_rules, 'response_cache': cache},
+    )
+    results = await runner.run(load_tasks(tasks_path))
+
+    print("\n--- Batch Results ---")
+    for result in results:
+        print(f"[{result.status}] ({result.duration_s:.1f}s) {result.task[:60]}: {result.result or result.error}")
+        for kind, summary in result.metrics.items():
+            print(f"    {kind}: {summary}")
+    print(f"--- Stats: {runner.stats.model_dump()} ---")
+    if cache:
+        print(f"--- Cache: {cache.summary()} ---")
+    if agent_kwargs.get('plan_cache'):
+        print(f"--- Plan cache: {agent_kwargs['plan_cache'].summary()} ---")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the agent on the task above, or on a batch of tasks.")
+    parser.add_argument('--tasks', help="File with one task per line, or a .jsonl file of {\"task\": ...} objects")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=600.0, help="Per-task timeout in seconds")
+    parser.add_argument('--profile', choices=PROFILES, default='headed', help="Browser launch profile")
+    parser.add_argument('--block', nargs='*', choices=BLOCK_PRESETS, default=[], help="Request types to block, e.g. --block media+fonts trackers")
+    parser.add_argument('--cache-dir', help="Directory of an HTTP response cache shared by all tasks and runs")
+    parser.add_argument('--cache-size-mb', type=float, default=512)
+    parser.add_argument('--stream', action='store_true', help="Stream LLM responses and start tool calls before the response is complete")
+    parser.add_argument('--plan-cache', help="Directory where completed runs are recorded and replayed for repeated tasks")
+    parser.add_argument('--trace-dir', help="Directory to write per-stage timings to, as trace.jsonl and a Chrome trace (trace.json)")
+    args = parser.parse_args()
+    profile = PROFILES[args.profile]()
+    block_rules = BlockRules.from_presets(*args.block)
+    cache = ResponseCache(args.cache_dir, max_size_mb=args.cache_size_mb) if args.cache_dir else None
+    tracer = Tracer() if args.trace_dir else None
+    agent_kwargs = {
+        'streaming': args.stream,
+        'plan_cache': PlanCache(args.plan_cache) if args.plan_cache else None,
+        'tracer': tracer,
+    }
     try:
-        asyncio.run(main())
+        asyncio.run(
+            run_batch(args.tasks, args.concurrency, args.timeout, profile, block_rules, cache, agent_kwargs) if args.tasks
+            else main(profile, block_rules, cache, agent_kwargs)
+        )
     except ValueError as e:
         print(f"Configuration Error: {e}")
     except KeyboardInterrupt:
-        print("\nExecution interrupted by user.")
\ No newline at end of file
+        print("\nExecution interrupted by user.")
+    finally:
+        if tracer:
+            os.makedirs(args.trace_dir, exist_ok=True)
+            tracer.export_jsonl(os.path.join(args.trace_dir, 'trace.jsonl'))
+            tracer.export_chrome_trace(os.path.join(args.trace_dir, 'trace.json'))
+            print(f"--- Trace: {tracer.summary()['spans']} ---")
+            print(f"Trace written to {args.trace_dir} (open trace.json in chrome://tracing or ui.perfetto.dev)")
\ No newline at end of file
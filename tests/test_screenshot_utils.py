@@ -0,0 +1,37 @@
+"""
+The unchanged-frame check of Browser.render_screenshot: small changes the perceptual hash cannot see
+must still show up in the frame digest.
+
+    python -m pytest tests
+"""
+from PIL import Image, ImageDraw
+
+from auto_nav.screenshot_utils import digest_difference, frame_digest, hamming_distance, perceptual_hash
+
+
+def page_frame() -> Image.Image:
+    image = Image.new('RGB', (1280, 800), 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(0, 800, 40):
+        draw.text((20, y), 'Some label text here ' * 5, fill='black')
+    draw.rectangle([600, 400, 612, 412], outline='black')
+    return image
+
+
+def test_identical_frames():
+    assert digest_difference(frame_digest(page_frame()), frame_digest(page_frame())) == 0
+
+
+def test_small_changes_show_in_the_digest():
+    ticked = page_frame()
+    ImageDraw.Draw(ticked).line([602, 406, 610, 402], fill='black', width=2)
+    typed = page_frame()
+    ImageDraw.Draw(typed).text((700, 300), 'x', fill='black')
+    for changed in (ticked, typed):
+        # Too small for the hash, which is why the digest is compared as well
+        assert hamming_distance(perceptual_hash(page_frame()), perceptual_hash(changed)) == 0
+        assert digest_difference(frame_digest(page_frame()), frame_digest(changed)) > 0
+
+
+def test_resized_frames_differ():
+    assert digest_difference(frame_digest(page_frame()), frame_digest(page_frame().resize((640, 400)))) == 255
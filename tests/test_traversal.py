@@ -0,0 +1,109 @@
+"""
+Regression test for the single-pass traversal in dom_utils._collect_nodes: its xpaths, order and
+depths must match the traversal it replaced, on the benchmark fixtures and on wide pages.
+
+    python -m pytest tests
+"""
+from collections import Counter
+from typing import Optional
+
+import pytest
+from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+
+from auto_nav.dom_utils import _collect_nodes, _is_active, _is_element_accepted, _is_interactive_element, _is_leaf_element
+from benchmarks.common import FIXTURES_DIR, fixture_paths, text_heavy_page, wide_page
+
+
+def reference_nodes(body: Optional[Tag]) -> tuple[dict, dict]:
+    """
+    The traversal get_elements used before _collect_nodes: every tag looks up its position among its
+    same-tag siblings and the xpath is joined from the whole path, depth is derived from the xpath.
+    Siblings are compared by identity: the old list.index() compared by equality, which gave every
+    structurally identical sibling the xpath of the first one.
+    """
+    interactive_elements: dict[str, tuple[int, int]] = {}  # xpath -> (order, depth)
+    text_nodes: dict[str, tuple[int, int]] = {}            # parent xpath -> (order, parent depth)
+    order = 0
+    positions: dict[int, dict[int, int]] = {}  # id(parent) -> id(tag) -> position among same-tag siblings
+
+    def sibling_index(element: Tag) -> int:
+        parent = element.parent
+        if id(parent) not in positions:
+            counters: Counter = Counter()
+            positions[id(parent)] = {}
+            for sibling in parent.find_all(recursive=False):
+                counters[sibling.name] += 1
+                positions[id(parent)][id(sibling)] = counters[sibling.name]
+        return positions[id(parent)][id(element)]
+
+    dom_queue: list[tuple[PageElement, list, Optional[str]]] = (
+        [(element, [], None) for element in reversed(list(body.children))] if body else []
+    )
+    queued = Counter(id(element) for element, _, _ in dom_queue)
+    while dom_queue:
+        element, path_indices, parent_xpath = dom_queue.pop()
+        queued[id(element)] -= 1
+        if isinstance(element, Tag):
+            if not _is_element_accepted(element):
+                element.decompose()
+                continue
+            current_path = path_indices + [(element.name, sibling_index(element))]
+            element_xpath = '//' + '/'.join(f'{tag}[{index}]' for tag, index in current_path)
+            for child in reversed(list(element.children)):
+                dom_queue.append((child, current_path, element_xpath))
+                queued[id(child)] += 1
+            if (_is_interactive_element(element) or _is_leaf_element(element)) and _is_active(element):
+                interactive_elements[element_xpath] = (order, len(element_xpath.split('/')) - 2)
+                order += 1
+        elif isinstance(element, NavigableString) and element.strip():
+            if element.parent and not queued[id(element.parent)] and parent_xpath:
+                text_nodes[parent_xpath] = (order, len(parent_xpath.split('/')) - 2)
+                order += 1
+    return interactive_elements, text_nodes
+
+
+def assert_same_traversal(html: str) -> None:
+    interactive_elements, text_nodes = _collect_nodes(BeautifulSoup(html, 'html.parser').body)
+    expected_elements, expected_texts = reference_nodes(BeautifulSoup(html, 'html.parser').body)
+    # Lists keep the order of the dicts, which is the order the DOM items are built in
+    assert [(xpath, order, depth) for xpath, (_, order, depth) in interactive_elements.items()] == [
+        (xpath, order, depth) for xpath, (order, depth) in expected_elements.items()
+    ]
+    assert [(xpath, order, depth) for xpath, (_, order, depth) in text_nodes.items()] == [
+        (xpath, order, depth) for xpath, (order, depth) in expected_texts.items()
+    ]
+
+
+@pytest.mark.parametrize('path', fixture_paths(FIXTURES_DIR), ids=lambda path: path.name)
+def test_fixture_pages(path):
+    assert_same_traversal(path.read_text())
+
+
+@pytest.mark.parametrize('siblings', [10_000, 20_000])
+def test_wide_pages(siblings):
+    assert_same_traversal(wide_page(siblings))
+
+
+def test_text_heavy_page():
+    assert_same_traversal(text_heavy_page(5_000))
+
+
+def test_identical_siblings():
+    item = '<li><a href="/same">Same</a></li>'
+    html = f'<html><body><ul>{item * 10_000}</ul><ul>{item * 3}</ul></body></html>'
+    assert_same_traversal(html)
+    interactive_elements, _ = _collect_nodes(BeautifulSoup(html, 'html.parser').body)
+    # Every identical sibling has its own position, none collides with the first one
+    assert len(interactive_elements) == 10_000 + 3
+    assert '//ul[1]/li[10000]/a[1]' in interactive_elements
+    assert '//ul[2]/li[3]/a[1]' in interactive_elements
+
+
+def test_mixed_tags_and_skipped_elements():
+    html = (
+        '<html><body><div>'
+        '<span>a</span><p>b</p><span>c</span><script>x</script><span>d</span>'
+        '<div><button>e</button>tail<button>e</button></div>'
+        '</div></body></html>'
+    )
+    assert_same_traversal(html)